@@ -0,0 +1,193 @@
+"""Benchmarks for the Spritmonitor analytics.
+
+Times every calculator and each stage of the update pipeline (parse ->
+build -> analytics, plus a full replay of the rolling windows and period
+buckets) over synthetic combustion, EV and PHEV histories, records
+allocations with tracemalloc and writes a JSON report.
+
+Run from the repository root, in an environment with Home Assistant installed:
+
+    python benchmarks/run_benchmarks.py --output report.json
+    python benchmarks/run_benchmarks.py --compare report.json
+
+--compare exits with status 1 if any timing got slower than --threshold
+times the baseline (and by more than --noise-floor microseconds).
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from synthetic import PROFILES, generate_fuelings, generate_reminders, generate_vehicle  # noqa: E402
+
+from custom_components.spritmonitor import analytics  # noqa: E402
+from custom_components.spritmonitor.coordinator import build_vehicle_data  # noqa: E402
+from custom_components.spritmonitor.history import _to_rows  # noqa: E402
+from custom_components.spritmonitor.windows import WindowEngine, vehicle_tanks  # noqa: E402
+
+SIZES = (20, 1_000, 10_000, 100_000)
+VEHICLE_TYPES = {"combustion": "combustion", "electric": "electric", "phev": "phev"}
+MIN_SAMPLE_TIME = 0.05  # seconds per repeat, to get above timer resolution
+
+
+def _calculators(data: dict) -> dict:
+    """Every calculator, bound to the inputs compute_analytics() gives it."""
+    tank = data["refuelings"] or data["electric_charges"]
+    last = data["last_refueling"] or data["last_electric_charge"]
+    consumption = data["vehicle"]["consumption"]
+    return {
+        "calculate_price_per_unit": lambda: analytics.calculate_price_per_unit(last.cost, last.quantity),
+        "format_cost": lambda: analytics.format_cost(last.cost),
+        "get_next_service_reminder": lambda: analytics.get_next_service_reminder(data["reminders"]),
+        "get_next_service_date_reminder": lambda: analytics.get_next_service_date_reminder(data["reminders"]),
+        "calculate_km_to_service": lambda: analytics.calculate_km_to_service(data),
+        "calculate_fuel_level_estimate": lambda: analytics.calculate_fuel_level_estimate(data),
+        "calculate_range_estimate": lambda: analytics.calculate_range_estimate(data),
+        "calculate_consumption_trend": lambda: analytics.calculate_consumption_trend(tank),
+        "calculate_consumption_consistency": lambda: analytics.calculate_consumption_consistency(tank),
+        "calculate_avg_refuel_quantity": lambda: analytics.calculate_avg_refuel_quantity(tank),
+        "calculate_avg_days_between_refuels": lambda: analytics.calculate_avg_days_between_refuels(tank),
+        "calculate_price_variability": lambda: analytics.calculate_price_variability(tank),
+        "calculate_eco_driving_index": lambda: analytics.calculate_eco_driving_index(tank, consumption),
+        "calculate_cost_per_distance": lambda: analytics.calculate_cost_per_distance(tank),
+        "calculate_full_battery_range": lambda: analytics.calculate_full_battery_range(data),
+        "calculate_efficiency_per_distance": lambda: analytics.calculate_efficiency_per_distance(data),
+    }
+
+
+def measure(fn, repeat: int) -> dict:
+    """Time fn (per call, in microseconds) and its allocations (in KiB)."""
+    number, elapsed = 1, 0.0
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SAMPLE_TIME or number >= 1_000_000:
+            break
+        number *= 10
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = fn()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "min_us": round(min(samples) * 1e6, 3),
+        "median_us": round(statistics.median(samples) * 1e6, 3),
+        "calls": number * repeat,
+        "peak_kib": round((peak - before) / 1024, 2),
+        "retained_kib": round((after - before) / 1024, 2),
+    }
+
+
+def bench_profile(profile: str, size: int, repeat: int, seed: int, end: date) -> dict:
+    vehicle_type = VEHICLE_TYPES[profile]
+    fuelings = generate_fuelings(profile, size, seed, end)
+    vehicle = generate_vehicle(profile, fuelings)
+    reminders = generate_reminders(fuelings, end)
+
+    rows = _to_rows(fuelings)
+    data = build_vehicle_data(vehicle, reminders, rows, vehicle_type)
+
+    def full_pipeline():
+        parsed = _to_rows(fuelings)
+        built = build_vehicle_data(vehicle, reminders, parsed, vehicle_type)
+        return analytics.compute_analytics(built, vehicle_type)
+
+    pipeline = {
+        "parse": measure(lambda: _to_rows(fuelings), repeat),
+        "build": measure(lambda: build_vehicle_data(vehicle, reminders, rows, vehicle_type), repeat),
+        "analytics": measure(lambda: analytics.compute_analytics(data, vehicle_type), repeat),
+        # A replay of every tank; regular updates only push the new fuelings.
+        "windows": measure(lambda: WindowEngine().update(vehicle_tanks(data, vehicle_type), end, 0), repeat),
+        "total": measure(full_pipeline, repeat),
+    }
+    calculators = {name: measure(fn, repeat) for name, fn in _calculators(data).items()}
+    return {"pipeline": pipeline, "calculators": calculators}
+
+
+def compare(report: dict, baseline: dict, threshold: float, noise_floor: float) -> list[str]:
+    """Timings slower than threshold x baseline, as human-readable lines."""
+    regressions = []
+    for profile, sizes in report["results"].items():
+        for size, groups in sizes.items():
+            for group, entries in groups.items():
+                for name, result in entries.items():
+                    try:
+                        old = baseline["results"][profile][size][group][name]["min_us"]
+                    except KeyError:
+                        continue
+                    new = result["min_us"]
+                    if new > old * threshold and new - old > noise_floor:
+                        regressions.append(f"{profile}/{size}/{group}/{name}: {old} us -> {new} us ({new / old:.2f}x)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=PROFILES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date.today(),
+                        help="date of the newest synthetic record (default: today)")
+    parser.add_argument("--output", type=Path, help="write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="baseline report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--noise-floor", type=float, default=5.0, help="ignore slowdowns below this many us")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "end_date": args.end_date.isoformat(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for profile in args.profiles:
+        for size in args.sizes:
+            result = bench_profile(profile, size, args.repeat, args.seed, args.end_date)
+            report["results"].setdefault(profile, {})[str(size)] = result
+            pipeline = result["pipeline"]
+            print(
+                f"{profile:>10} {size:>7} rows: total {pipeline['total']['min_us'] / 1000:9.2f} ms"
+                f"  analytics {pipeline['analytics']['min_us'] / 1000:8.3f} ms"
+                f"  peak {pipeline['total']['peak_kib'] / 1024:7.2f} MiB"
+            )
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold, args.noise_floor)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Synthetic Spritmonitor payloads for the benchmarks.
+
+Records use the shape of the fuelings.json / vehicles.json answers so the
+whole ingest path (FuelingRow.from_api onwards) is exercised. Generation is
+driven by a seeded random.Random, so a (profile, size, seed, end date) tuple
+always yields the same history.
+"""
+
+import random
+from datetime import date, timedelta
+
+PROFILES = ("combustion", "electric", "phev")
+MAX_SPAN_DAYS = 50 * 365
+
+_FUEL = {"every": (6, 21), "trip": (250, 750), "consumption": (6.4, 0.6), "price": (1.75, 0.01)}
+_CHARGE = {"every": (0, 3), "trip": (20, 260), "consumption": (17.5, 2.0), "price": (0.32, 0.005)}
+
+
+def _records(rng: random.Random, spec: dict, count: int, end: date, tank_id: int) -> list[tuple]:
+    """(date, tank_id, trip, quantity, consumption, price) tuples, oldest first."""
+    # Very large histories are squeezed into MAX_SPAN_DAYS (several records a day)
+    # so the dates stay valid.
+    scale = min(1.0, MAX_SPAN_DAYS / (count * sum(spec["every"]) / 2 or 1))
+    records, age, price = [], 0.0, spec["price"][0]
+    for _ in range(count):
+        trip = round(rng.uniform(*spec["trip"]), 1)
+        consumption = max(0.1, rng.gauss(*spec["consumption"]))
+        price = max(0.05, price + rng.gauss(0, spec["price"][1]))
+        day = end - timedelta(days=int(age))
+        records.append((day, tank_id, trip, round(trip * consumption / 100, 2), round(consumption, 2), price))
+        age += rng.uniform(*spec["every"]) * scale
+    records.reverse()
+    return records
+
+
+def generate_fuelings(profile: str, count: int, seed: int = 0, end: date | None = None) -> list[dict]:
+    """Return `count` raw fueling records for a vehicle of the given profile, newest first."""
+    rng = random.Random(f"{profile}:{count}:{seed}")
+    end = end or date.today()
+    if profile == "combustion":
+        records = _records(rng, _FUEL, count, end, 1)
+    elif profile == "electric":
+        records = _records(rng, _CHARGE, count, end, 1)
+    elif profile == "phev":
+        fuel = max(1, count // 8)
+        records = sorted(
+            _records(rng, _FUEL, fuel, end, 1) + _records(rng, _CHARGE, count - fuel, end, 2),
+            key=lambda r: r[0],
+        )
+    else:
+        raise ValueError(f"Unknown profile {profile!r}, expected one of {PROFILES}")
+
+    fuelings, odometer = [], 10000.0
+    for fueling_id, (day, tank_id, trip, quantity, consumption, price) in enumerate(records, start=1):
+        odometer += trip
+        fuelings.append({
+            "id": fueling_id,
+            "date": day.strftime("%d.%m.%Y"),
+            "odometer": round(odometer, 1),
+            "trip": trip,
+            "quantity": quantity,
+            "quantityunitid": 5 if tank_id == 2 or profile == "electric" else 1,
+            "type": "full" if rng.random() > 0.15 else "notfull",
+            "fuelsortid": 19 if tank_id == 2 or profile == "electric" else 7,
+            # Roughly one record in twenty is logged without a price.
+            "cost": round(quantity * price, 2) if rng.random() > 0.05 else None,
+            "currencyid": 0,
+            "consumption": consumption if rng.random() > 0.02 else 0,
+            "tankid": tank_id,
+            "location": rng.choice(["Home", "Work", "Highway", "Supermarket", None]),
+            "country": "D",
+        })
+    fuelings.reverse()
+    return fuelings
+
+
+def generate_vehicle(profile: str, fuelings: list[dict]) -> dict:
+    """vehicles.json entry consistent with the generated history."""
+    electric = profile == "electric"
+    main_tank = [f for f in fuelings if f["tankid"] == 1]
+    consumptions = [f["consumption"] for f in main_tank if f["consumption"]]
+    return {
+        "id": 1,
+        "make": "Synthetic",
+        "model": profile.upper(),
+        "sign": "B-EN 1234",
+        "tripsum": round(sum(f["trip"] for f in fuelings), 1),
+        "quantitysum": round(sum(f["quantity"] for f in main_tank), 2),
+        "consumption": round(sum(consumptions) / len(consumptions), 2) if consumptions else 0,
+        "capacity": 60 if electric else 50,
+        "tripunit": "km",
+        "quantityunit": "kWh" if electric else "L",
+        "consumptionunit": "kWh/100km" if electric else "l/100km",
+        "rankingInfo": {"rank": 120, "total": 900, "min": 4.1, "avg": 6.9},
+    }
+
+
+def generate_reminders(fuelings: list[dict], end: date | None = None) -> list[dict]:
+    odometer = fuelings[0]["odometer"] if fuelings else 0
+    end = end or date.today()
+    return [
+        {"completed": 0, "next_odometer": odometer + 4200, "note": "Oil change", "nextdate": None},
+        {"completed": 0, "next_odometer": odometer + 15000, "note": "Inspection",
+         "nextdate": (end + timedelta(days=90)).strftime("%d.%m.%Y")},
+        {"completed": 1, "next_odometer": odometer - 500, "note": "Tyres", "nextdate": None},
+    ]
@@ -0,0 +1,221 @@
+"""Derived metrics for the Spritmonitor sensors.
+
+compute_analytics() runs every calculator exactly once per coordinator update
+and returns the results keyed by sensor id, so entities only do a dict lookup.
+Fueling lists hold models.FuelingRow objects, newest first.
+"""
+
+from datetime import datetime
+
+from .const import VEHICLE_TYPE_COMBUSTION, VEHICLE_TYPE_ELECTRIC, VEHICLE_TYPE_PHEV
+
+# Marks an intermediate result that the caller did not precompute.
+_NOT_COMPUTED = object()
+_VALUE_ERRORS = (KeyError, TypeError, AttributeError, ValueError, IndexError)
+
+def calculate_price_per_unit(cost, quantity):
+    if not cost or not quantity or float(quantity) == 0: return None
+    return round(float(cost) / float(quantity), 3)
+def format_cost(cost):
+    if cost is None: return None
+    return round(float(cost), 2)
+def get_next_service_reminder(reminders):
+    if not reminders: return None
+    incomplete_reminders = [r for r in reminders if r.get('completed') == 0]
+    if not incomplete_reminders: return None
+    return min(incomplete_reminders, key=lambda x: x.get('next_odometer', float('inf')))
+def get_next_service_date_reminder(reminders):
+    if not reminders: return None
+    incomplete_reminders = [r for r in reminders if r.get('completed') == 0 and r.get('nextdate')]
+    if not incomplete_reminders: return None
+    reminders_with_dates = []
+    for r in incomplete_reminders:
+        try:
+            date_str = r.get('nextdate')
+            if date_str:
+                parsed_date = datetime.strptime(date_str, '%d.%m.%Y').date()
+                r['parsed_date'] = parsed_date
+                reminders_with_dates.append(r)
+        except (ValueError, TypeError): pass
+    if not reminders_with_dates: return None
+    return min(reminders_with_dates, key=lambda x: x['parsed_date']).get('parsed_date')
+def calculate_km_to_service(data, next_service=_NOT_COMPUTED):
+    if next_service is _NOT_COMPUTED:
+        next_service = get_next_service_reminder(data.get('reminders', []))
+    if not next_service or not data.get('last_refueling'): return None
+    current_km = data['last_refueling'].odometer or 0.0
+    service_km = next_service.get('next_odometer', 0)
+    return max(0, service_km - current_km)
+def calculate_fuel_level_estimate(data):
+    if not data.get('vehicle') or not data.get('last_gas_refueling'): return None
+    capacity = float(data['vehicle'].get('capacity', 0))
+    last_refuel_quantity = data['last_gas_refueling'].quantity or 0.0
+    return min(capacity, last_refuel_quantity) if capacity > 0 else None
+def calculate_range_estimate(data, fuel_level=_NOT_COMPUTED):
+    if fuel_level is _NOT_COMPUTED:
+        fuel_level = calculate_fuel_level_estimate(data)
+    if not fuel_level or not data.get('vehicle'): return None
+    consumption_val = float(data['vehicle'].get('consumption', 0))
+    consumption_unit = data.get('units', {}).get('consumption', '')
+    if consumption_val <= 0: return None
+    if '100' in consumption_unit:
+        return round((fuel_level / consumption_val) * 100)
+    return round(fuel_level * consumption_val)
+def calculate_consumption_trend(refuelings):
+    if not refuelings or len(refuelings) < 3: return None
+    consumptions = [r.consumption for r in refuelings[:5] if r.consumption and r.consumption > 0]
+    if len(consumptions) < 3: return None
+    recent_avg = sum(consumptions[:2]) / 2
+    older_avg = sum(consumptions[2:4]) / 2 if len(consumptions) >= 4 else consumptions[2]
+    if older_avg == 0: return "stable"
+    trend_ratio = recent_avg / older_avg
+    if trend_ratio < 0.95: return "improving"
+    elif trend_ratio > 1.05: return "worsening"
+    else: return "stable"
+def calculate_consumption_consistency(refuelings):
+    if not refuelings or len(refuelings) < 3: return None
+    consumptions = [r.consumption for r in refuelings[:5] if r.consumption and r.consumption > 0]
+    if len(consumptions) < 3: return None
+    mean = sum(consumptions) / len(consumptions)
+    variance = sum((x - mean) ** 2 for x in consumptions) / len(consumptions)
+    return round(variance ** 0.5, 2)
+def calculate_avg_refuel_quantity(refuelings):
+    if not refuelings: return None
+    quantities = [r.quantity for r in refuelings[:5] if r.quantity and r.quantity > 0]
+    if not quantities: return None
+    return round(sum(quantities) / len(quantities), 1)
+def calculate_avg_days_between_refuels(refuelings):
+    if not refuelings or len(refuelings) < 2: return None
+    dates = [r.date for r in refuelings[:5]]
+    if len(dates) < 2: return None
+    days_diffs = [(dates[i] - dates[i + 1]).days for i in range(len(dates) - 1) if (dates[i] - dates[i + 1]).days > 0]
+    if not days_diffs: return None
+    return round(sum(days_diffs) / len(days_diffs), 1)
+def calculate_price_variability(refuelings):
+    if not refuelings: return None
+    prices_per_unit = [r.cost / r.quantity for r in refuelings[:5] if r.cost and r.quantity and r.quantity > 0]
+    if len(prices_per_unit) < 2: return None
+    return round(max(prices_per_unit) - min(prices_per_unit), 2)
+def calculate_eco_driving_index(refuelings, vehicle_avg_consumption, consistency=_NOT_COMPUTED):
+    if not refuelings or not vehicle_avg_consumption or float(vehicle_avg_consumption) == 0: return None
+    recent_consumptions = [r.consumption for r in refuelings[:3] if r.consumption and r.consumption > 0]
+    if not recent_consumptions: return None
+    recent_avg = sum(recent_consumptions) / len(recent_consumptions)
+    vehicle_avg = float(vehicle_avg_consumption)
+    performance_ratio = recent_avg / vehicle_avg
+    if performance_ratio < 0.9: performance_score = 10
+    elif performance_ratio < 1.0: performance_score = 8
+    elif performance_ratio < 1.1: performance_score = 6
+    else: performance_score = 4
+    if consistency is _NOT_COMPUTED:
+        consistency = calculate_consumption_consistency(refuelings)
+    consistency = consistency or 5
+    consistency_score = max(0, 10 - consistency * 5)
+    eco_index = (performance_score * 0.7 + consistency_score * 0.3)
+    return round(eco_index, 1)
+def calculate_cost_per_distance(refuelings):
+    if not refuelings or len(refuelings) < 2: return None
+    total_cost, total_trip = 0.0, 0.0
+    for r in refuelings[:10]:
+        if r.cost and r.trip and r.trip > 0:
+            total_cost += r.cost
+            total_trip += r.trip
+    if total_trip == 0: return None
+    return round(total_cost / total_trip, 2)
+def calculate_full_battery_range(data):
+    if not data.get('vehicle'): return None
+    capacity = float(data['vehicle'].get('capacity', 0))
+    consumption_per_100km = float(data['vehicle'].get('consumption', 0))
+    if capacity <= 0 or consumption_per_100km <= 0: return None
+    return round((capacity * 100) / consumption_per_100km)
+
+def calculate_efficiency_per_distance(data):
+    """Converts kWh/100km (or mi) to km/kWh (or mi/kWh).
+
+    The vehicle's average consumption is stored as kWh/100km (or kWh/100mi).
+    This sensor inverts that to give efficiency as distance-per-kWh (e.g. mi/kWh),
+    which is the format shown on the Spritmonitor /tanks.json endpoint and is often
+    more intuitive for EV drivers familiar with MPGe-style figures.
+    """
+    if not data.get('vehicle'): return None
+    consumption = float(data['vehicle'].get('consumption', 0))
+    if consumption <= 0: return None
+    return round(100 / consumption, 2)
+
+
+def compute_analytics(data, vehicle_type):
+    """Return every sensor value for one coordinator payload, keyed by sensor id."""
+    results = {}
+
+    def put(key, fn):
+        try:
+            results[key] = fn()
+        except _VALUE_ERRORS:
+            results[key] = None
+
+    d = data
+    put("brand_model", lambda: f"{d['vehicle'].get('make', '')} {d['vehicle'].get('model', '')}")
+    put("license_plate", lambda: d['vehicle'].get('sign'))
+    put("total_distance", lambda: float(d['vehicle'].get('tripsum', 0)))
+    last = d.get('last_refueling')
+    put("last_refuel_date", lambda: last.date_str)
+    put("last_refuel_odometer", lambda: last.odometer or 0.0)
+    put("last_refuel_trip", lambda: last.trip or 0.0)
+    put("last_refuel_cost", lambda: format_cost(last.cost))
+    put("last_refuel_type", lambda: last.type)
+    put("last_refuel_location", lambda: last.location)
+    put("last_refuel_country", lambda: last.country)
+    put("ranking_position", lambda: d['vehicle']['rankingInfo'].get('rank'))
+    put("ranking_total", lambda: d['vehicle']['rankingInfo'].get('total'))
+    put("ranking_min_consumption", lambda: float(d['vehicle']['rankingInfo'].get('min', 0)))
+    put("ranking_avg_consumption", lambda: float(d['vehicle']['rankingInfo'].get('avg', 0)))
+
+    put("_next_service", lambda: get_next_service_reminder(d.get('reminders', [])))
+    next_service = results.pop("_next_service")
+    put("next_service_km", lambda: next_service.get('next_odometer') if next_service else None)
+    put("next_service_note", lambda: next_service.get('note') if next_service else None)
+    put("next_service_date", lambda: get_next_service_date_reminder(d.get('reminders', [])))
+    put("km_to_next_service", lambda: calculate_km_to_service(d, next_service))
+
+    if vehicle_type in [VEHICLE_TYPE_COMBUSTION, VEHICLE_TYPE_PHEV]:
+        put("fuel_capacity", lambda: float(d['vehicle'].get('capacity', 0)))
+        put("total_fuel", lambda: float(d['vehicle'].get('quantitysum', 0)))
+        put("avg_consumption", lambda: float(d['vehicle'].get('consumption', 0)))
+        last_gas = d.get('last_gas_refueling')
+        put("last_refuel_quantity", lambda: last_gas.quantity or 0.0)
+        put("last_refuel_price_per_liter", lambda: last_gas.price_per_unit)
+        put("last_refuel_consumption", lambda: last_gas.consumption or 0.0)
+        put("fuel_level_estimate", lambda: calculate_fuel_level_estimate(d))
+        fuel_level = results["fuel_level_estimate"]
+        put("range_estimate", lambda: calculate_range_estimate(d, fuel_level))
+
+    if vehicle_type in [VEHICLE_TYPE_ELECTRIC, VEHICLE_TYPE_PHEV]:
+        put("battery_capacity", lambda: float(d['vehicle'].get('capacity', 0)))
+        put("total_energy_charged", lambda: float(d['vehicle'].get('quantitysum', 0)))
+        put("avg_energy_consumption", lambda: float(d['vehicle'].get('consumption', 0)))
+        last_charge = d.get('last_electric_charge')
+        put("last_charge_energy", lambda: last_charge.quantity or 0.0)
+        put("last_charge_price_per_kwh", lambda: last_charge.price_per_unit)
+        put("last_charge_consumption", lambda: last_charge.consumption or 0.0)
+        put("full_battery_range_estimate", lambda: calculate_full_battery_range(d))
+        put("efficiency_per_distance", lambda: calculate_efficiency_per_distance(d))
+
+    vehicle_consumption = (d.get('vehicle') or {}).get('consumption')
+    if vehicle_type == VEHICLE_TYPE_PHEV:
+        _put_tank_analytics(put, results, "_fuel", d.get('gas_refuelings', []), vehicle_consumption)
+        _put_tank_analytics(put, results, "_electric", d.get('electric_charges', []), vehicle_consumption)
+    else:
+        _put_tank_analytics(put, results, "", d.get('refuelings', []), vehicle_consumption)
+
+    return results
+
+
+def _put_tank_analytics(put, results, suffix, refuelings, vehicle_consumption):
+    put(f"consumption_trend{suffix}", lambda: calculate_consumption_trend(refuelings))
+    put(f"consumption_consistency{suffix}", lambda: calculate_consumption_consistency(refuelings))
+    put(f"price_variability{suffix}", lambda: calculate_price_variability(refuelings))
+    put(f"cost_per_distance{suffix}", lambda: calculate_cost_per_distance(refuelings))
+    consistency = results[f"consumption_consistency{suffix}"]
+    put(f"avg_refuel_quantity{suffix}", lambda: calculate_avg_refuel_quantity(refuelings))
+    put(f"avg_days_between_refuels{suffix}", lambda: calculate_avg_days_between_refuels(refuelings))
+    put(f"eco_driving_index{suffix}", lambda: calculate_eco_driving_index(refuelings, vehicle_consumption, consistency))
@@ -0,0 +1,315 @@
+"""HTTP client shared by every Spritmonitor API call of one account."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+from collections import Counter
+from collections.abc import Mapping
+from functools import partial
+from typing import Any, NamedTuple
+
+import aiohttp
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    DOMAIN,
+    DATA_CLIENTS,
+    API_TIMEOUT,
+    API_RATE_LIMIT,
+    API_RATE_BURST,
+    API_MAX_CONCURRENCY,
+    API_RETRY_ATTEMPTS,
+    API_RETRY_BASE_DELAY,
+    API_RETRY_MAX_DELAY,
+    API_BREAKER_THRESHOLD,
+    API_BREAKER_COOLDOWN,
+    API_FRESHNESS_TTL,
+)
+from .metrics import NO_METRICS, UpdateMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SpritmonitorApiError(aiohttp.ClientError):
+    """The API answered with an error status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class SpritmonitorCircuitOpenError(aiohttp.ClientError):
+    """Calls are suspended because the API kept failing."""
+
+
+class ApiResponse(NamedTuple):
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+    def raise_for_status(self) -> None:
+        if self.status >= 400:
+            raise SpritmonitorApiError(self.status, self.text[:200])
+
+
+def _request_key(url: str, params: dict | None, headers: dict | None) -> tuple:
+    return url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items()))
+
+
+def build_headers(app_token: str, bearer_token: str) -> dict:
+    """Return the request headers for a Spritmonitor account."""
+    return {
+        "Accept": "application/json",
+        "Application-Id": app_token,
+        "Authorization": bearer_token,
+    }
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def async_acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class CircuitBreaker:
+    """Open after repeated failures; after a cooldown let a single probe through."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._failures = 0
+        self._opened_at = 0.0
+        self.state = self.CLOSED
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        # Open or half open: one probe per cooldown period.
+        if time.monotonic() - self._opened_at >= self._cooldown:
+            self.state = self.HALF_OPEN
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            _LOGGER.info("Spritmonitor API reachable again, circuit closed")
+        self._failures = 0
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self._threshold:
+            if self.state != self.OPEN:
+                _LOGGER.warning(
+                    "Spritmonitor API failing, pausing requests for %d s", self._cooldown
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+class SpritmonitorClient:
+    """Rate limited, retrying, circuit-broken access to the API for one token pair."""
+
+    def __init__(self, hass: HomeAssistant, app_token: str, bearer_token: str) -> None:
+        self.hass = hass
+        self.headers = build_headers(app_token, bearer_token)
+        self.stats = Counter()
+        self._bucket = TokenBucket(API_RATE_LIMIT, API_RATE_BURST)
+        self._semaphore = asyncio.Semaphore(API_MAX_CONCURRENCY)
+        self.breaker = CircuitBreaker(API_BREAKER_THRESHOLD, API_BREAKER_COOLDOWN)
+        self._session = async_get_clientsession(hass)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self._recent: dict[tuple, tuple[float, ApiResponse]] = {}
+
+    async def async_get(
+        self, url: str, *, params: dict | None = None, headers: dict | None = None,
+        timeout: float = API_TIMEOUT, max_age: float = API_FRESHNESS_TTL,
+    ) -> ApiResponse:
+        """GET with single-flight and a short freshness TTL.
+
+        Callers asking for the same request (URL, params and headers) while it
+        is in flight await that one request; a successful response is reused
+        for `max_age` seconds. Writes through this client drop the reused
+        responses. A caller being cancelled does not cancel the shared request.
+        """
+        key = _request_key(url, params, headers)
+        recent = self._recent.get(key)
+        if recent and time.monotonic() - recent[0] < max_age:
+            self.stats["get_fresh_hits"] += 1
+            return recent[1]
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["get_inflight_hits"] += 1
+        else:
+            self.stats["get_misses"] += 1
+            task = self.hass.async_create_background_task(
+                self.async_request("GET", url, params=params, headers=headers, timeout=timeout),
+                f"spritmonitor GET {url}",
+            )
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._async_get_done, key))
+        return await asyncio.shield(task)
+
+    def _async_get_done(self, key: tuple, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # exception() also marks the error as retrieved when every caller was cancelled.
+        if task.cancelled() or task.exception() is not None or task.result().status >= 400:
+            return
+        now = time.monotonic()
+        for old in [k for k, (at, _) in self._recent.items() if now - at >= API_FRESHNESS_TTL]:
+            del self._recent[old]
+        self._recent[key] = (now, task.result())
+
+    async def async_request(
+        self, method: str, url: str, *, params: dict | None = None, data: dict | None = None,
+        headers: dict | None = None, timeout: float = API_TIMEOUT, idempotent: bool = True,
+    ) -> ApiResponse:
+        """Perform a request and return the final response, whatever its status.
+
+        429 and 5xx answers and connection errors are retried with jittered
+        exponential backoff. Non-idempotent requests (POST) are only retried on
+        429, when the server did not process them.
+        """
+        if not self.breaker.allow():
+            self.stats["rejected_open_circuit"] += 1
+            raise SpritmonitorCircuitOpenError("Spritmonitor API temporarily unavailable")
+        if method != "GET":
+            # The write may change what any recent GET returned.
+            self._recent.clear()
+
+        request_headers = {**self.headers, **headers} if headers else self.headers
+        session = self._session
+        for attempt in range(API_RETRY_ATTEMPTS):
+            retry_after = None
+            try:
+                await self._bucket.async_acquire()
+                async with self._semaphore:
+                    self.stats["requests"] += 1
+                    async with session.request(
+                        method, url, params=params, data=data, headers=request_headers,
+                        timeout=aiohttp.ClientTimeout(total=timeout),
+                    ) as response:
+                        result = ApiResponse(response.status, response.headers.copy(), await response.read())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                if not idempotent or attempt == API_RETRY_ATTEMPTS - 1:
+                    self.breaker.record_failure()
+                    raise
+                _LOGGER.debug("%s %s failed (%s), retrying", method, url, err)
+            else:
+                retryable = result.status in RETRY_STATUSES and (idempotent or result.status == 429)
+                if not retryable or attempt == API_RETRY_ATTEMPTS - 1:
+                    if result.status in RETRY_STATUSES:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()
+                    return result
+                _LOGGER.debug("%s %s returned %s, retrying", method, url, result.status)
+                retry_after = result.headers.get("Retry-After")
+
+            self.stats["retries"] += 1
+            delay = random.uniform(0, min(API_RETRY_MAX_DELAY, API_RETRY_BASE_DELAY * 2 ** attempt))
+            if retry_after and retry_after.isdigit():
+                delay = min(float(retry_after), API_RETRY_MAX_DELAY)
+            await asyncio.sleep(delay)
+
+    async def async_get_json(
+        self, url: str, params: dict | None = None, *,
+        metrics: UpdateMetrics = NO_METRICS, stage: str = "request", **kwargs,
+    ) -> Any:
+        with metrics.time(f"{stage}_request"):
+            response = await self.async_get(url, params=params, **kwargs)
+        metrics.add(f"{stage}_bytes", len(response.body))
+        response.raise_for_status()
+        with metrics.time(f"{stage}_decode"):
+            return response.json()
+
+
+class ConditionalResponseCache:
+    """Remember previous GET responses to skip unchanged payloads.
+
+    Requests carry If-None-Match / If-Modified-Since when the API sent an ETag
+    or Last-Modified header; a 304, or a body with the same SHA-256 as last
+    time, returns the previous payload without decoding it again.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple, dict] = {}
+
+    async def async_get(
+        self, client: SpritmonitorClient, url: str, params: dict | None = None, *,
+        metrics: UpdateMetrics = NO_METRICS, stage: str = "request", max_age: float = API_FRESHNESS_TTL,
+    ) -> tuple:
+        """Return (payload, changed) for a GET request."""
+        key = (url, tuple(sorted((params or {}).items())))
+        cached = self._entries.get(key)
+        headers = {}
+        if cached and cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        with metrics.time(f"{stage}_request"):
+            response = await client.async_get(url, params=params, headers=headers, max_age=max_age)
+        metrics.add(f"{stage}_bytes", len(response.body))
+        if response.status == 304 and cached:
+            return cached["payload"], False
+        response.raise_for_status()
+
+        digest = hashlib.sha256(response.body).hexdigest()
+        if cached and cached["digest"] == digest:
+            return cached["payload"], False
+        with metrics.time(f"{stage}_decode"):
+            payload = response.json()
+        self._entries[key] = {
+            "digest": digest,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "payload": payload,
+        }
+        return payload, True
+
+    def forget(self, url: str, params: dict | None = None) -> None:
+        """Drop a remembered response, so the next one counts as changed."""
+        self._entries.pop((url, tuple(sorted((params or {}).items()))), None)
+
+
+def async_get_client(hass: HomeAssistant, app_token: str, bearer_token: str) -> SpritmonitorClient:
+    """Return the shared client of a token pair."""
+    clients = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_CLIENTS, {})
+    key = (app_token, bearer_token)
+    if key not in clients:
+        clients[key] = SpritmonitorClient(hass, app_token, bearer_token)
+    return clients[key]
@@ -1,7 +1,6 @@
 # Contenido para: config_flow.py
 
 from homeassistant import config_entries
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 import voluptuous as vol
 import aiohttp
 import logging
@@ -17,11 +16,15 @@ from .const import (
     CONF_UPDATE_INTERVAL,
     CONF_VEHICLE_TYPE,
     CONF_CURRENCY,
+    CONF_FLEET,
+    FLEET_UNIQUE_ID,
     VEHICLE_TYPE_COMBUSTION,
     VEHICLE_TYPE_ELECTRIC,
     VEHICLE_TYPE_PHEV,
 )
 
+from .api import SpritmonitorClient
+
 _LOGGER = logging.getLogger(__name__)
 
 class SpritmonitorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -33,10 +36,9 @@ class SpritmonitorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         
         if user_input is not None:
             try:
-                session = async_get_clientsession(self.hass)
-                vehicle_info = await self._get_vehicle_info(
-                    session, user_input[CONF_VEHICLE_ID], user_input[CONF_APP_TOKEN], user_input[CONF_BEARER_TOKEN]
-                )
+                # Only validates the tokens: the shared client is created once the entry is set up.
+                client = SpritmonitorClient(self.hass, user_input[CONF_APP_TOKEN], user_input[CONF_BEARER_TOKEN])
+                vehicle_info = await self._get_vehicle_info(client, user_input[CONF_VEHICLE_ID])
                 if vehicle_info:
                     make = vehicle_info.get("make", "")
                     model = vehicle_info.get("model", "")
@@ -73,9 +75,18 @@ class SpritmonitorConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=data_schema, errors=errors
         )
 
-    async def _get_vehicle_info(self, session: aiohttp.ClientSession, vehicle_id: int, app_token: str, bearer_token: str) -> dict | None:
-        headers = { "Application-Id": app_token, "Authorization": bearer_token }
-        async with session.get(API_VEHICLES_URL, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as response:
-            response.raise_for_status()
-            vehicles = await response.json()
-            return next((v for v in vehicles if v["id"] == vehicle_id), None)
\ No newline at end of file
+    async def async_step_integration_discovery(self, discovery_info):
+        """Offered by the integration itself once more than one vehicle is set up."""
+        await self.async_set_unique_id(FLEET_UNIQUE_ID)
+        self._abort_if_unique_id_configured()
+        return await self.async_step_fleet()
+
+    async def async_step_fleet(self, user_input=None):
+        """Create the entry that hosts the fleet aggregate sensors."""
+        if user_input is not None:
+            return self.async_create_entry(title="Spritmonitor Fleet", data={CONF_FLEET: True})
+        return self.async_show_form(step_id="fleet")
+
+    async def _get_vehicle_info(self, client: SpritmonitorClient, vehicle_id: int) -> dict | None:
+        vehicles = await client.async_get_json(API_VEHICLES_URL, timeout=10)
+        return next((v for v in vehicles if v["id"] == vehicle_id), None)
\ No newline at end of file
@@ -1,6 +1,8 @@
 # Contenido para: const.py
 
 """Constants for the Spritmonitor integration."""
+from datetime import timedelta
+
 import voluptuous as vol
 import homeassistant.helpers.config_validation as cv
 
@@ -23,6 +25,78 @@ API_FUELINGS_URL_TPL = f"{API_BASE_URL}/vehicle/{{vehicle_id}}/fuelings.json"
 # --- LÍNEA ANTIGUA ELIMINADA ---
 # API_FUELINGS_URL = f"{API_BASE_URL}/fuelings.json"
 
+API_TIMEOUT = 30
+
+# Shared client (api.py): per-token rate limit, concurrency, retries and circuit breaker
+API_RATE_LIMIT = 2  # requests per second
+API_RATE_BURST = 5
+API_MAX_CONCURRENCY = 4
+API_RETRY_ATTEMPTS = 4
+API_RETRY_BASE_DELAY = 1  # seconds
+API_RETRY_MAX_DELAY = 30
+API_BREAKER_THRESHOLD = 5
+API_BREAKER_COOLDOWN = 300
+# Identical GETs share one in-flight request; a finished one is reused this long.
+API_FRESHNESS_TTL = 5  # seconds
+
+# Shared account data (vehicles.json / reminders.json) is reused by every vehicle
+# of the same tokens until shortly before the fastest one is due again.
+ACCOUNT_CACHE_MARGIN = timedelta(minutes=5)
+
+# Fueling history sync: the whole history is paged once and kept in a Store,
+# afterwards only the newest rows are probed for new fuelings.
+HISTORY_STORAGE_VERSION = 1
+HISTORY_PAGE_SIZE = 100
+HISTORY_PROBE_SIZE = 5
+HISTORY_FULL_RESYNC_INTERVAL = timedelta(days=7)
+
+# Warm start snapshot of the last successful coordinator payload
+SNAPSHOT_STORAGE_VERSION = 1
+SNAPSHOT_SCHEMA_VERSION = 1
+SNAPSHOT_SAVE_DELAY = 10
+
+# Adaptive polling (see scheduler.py)
+SCHEDULER_JITTER = 0.1
+SCHEDULER_IDLE_AFTER = timedelta(days=21)
+SCHEDULER_MAX_BACKOFF = 4
+SCHEDULER_MAX_INTERVAL = timedelta(hours=48)
+SCHEDULER_BURST_INTERVAL = timedelta(minutes=5)
+SCHEDULER_BURST_POLLS = 3
+SCHEDULER_DECISION_LOG = 50
+
+# Update instrumentation
+METRICS_WINDOW = 50  # updates kept for the diagnostics percentiles
+SIGNAL_METRICS_UPDATED = f"{DOMAIN}_metrics_updated_{{}}"  # format with the entry id
+
+# Rolling windows (windows.py): the last N fuelings and the last N days of a tank
+ROLLING_WINDOW_RECORDS = (10,)
+ROLLING_WINDOW_DAYS = (30, 90, 365)
+
+# Fleet aggregate (fleet.py): a separate config entry whose sensors sum up all vehicles
+CONF_FLEET = "fleet"
+FLEET_UNIQUE_ID = "spritmonitor_fleet"
+FLEET_RECOMPUTE_COOLDOWN = 2  # seconds
+SIGNAL_FLEET_UPDATED = f"{DOMAIN}_fleet_updated"
+
+# Per-vehicle webhook (webhook.py): bursts of calls are coalesced into one
+# fuelings-only refresh per cooldown.
+CONF_WEBHOOK_ID = "webhook_id"
+WEBHOOK_REFRESH_COOLDOWN = 10  # seconds
+
+# Offline write queue
+QUEUE_STORAGE_VERSION = 1
+QUEUE_RETRY_BASE_DELAY = 30  # seconds
+QUEUE_RETRY_MAX_DELAY = 3600  # seconds
+SIGNAL_QUEUE_UPDATED = f"{DOMAIN}_queue_updated"
+QUEUE_AGE_UPDATE_INTERVAL = timedelta(minutes=1)  # oldest-pending age sensor, while items wait
+
+# hass.data[DOMAIN] keys that are not config entry ids
+DATA_ACCOUNTS = "accounts"
+DATA_CLIENTS = "clients"
+DATA_QUEUE = "queue"
+DATA_INDEX = "index"
+DATA_FLEET = "fleet"
+
 # Configuration keys
 CONF_VEHICLE_ID = "vehicle_id"
 CONF_APP_TOKEN = "app_token"
@@ -73,4 +147,34 @@ SERVICE_ADD_FUELING_SCHEMA = vol.Schema(
         vol.Optional("attributes_heating"): vol.Any(bool, None),
         vol.Optional("attributes_trailer"): vol.Any(bool, None),
     }
-)
\ No newline at end of file
+)
+
+SERVICE_ADD_FUELINGS_BATCH = "add_fuelings_batch"
+SERVICE_ADD_FUELINGS_BATCH_SCHEMA = vol.All(
+    vol.Schema(
+        {
+            vol.Exclusive("fuelings", "source"): vol.All(cv.ensure_list, [dict]),
+            vol.Exclusive("file_path", "source"): cv.string,
+            vol.Optional("vehicle_device"): cv.string,
+        }
+    ),
+    cv.has_at_least_one_key("fuelings", "file_path"),
+)
+BATCH_MAX_PARALLEL = 4
+
+SERVICE_EXPORT_HISTORY = "export_history"
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+EXPORT_SOURCE_CACHE = "cache"
+EXPORT_SOURCE_API = "api"
+SERVICE_EXPORT_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required("vehicle_device"): cv.string,
+        vol.Optional("format", default="csv"): vol.In(EXPORT_FORMATS),
+        vol.Optional("source", default=EXPORT_SOURCE_CACHE): vol.In((EXPORT_SOURCE_CACHE, EXPORT_SOURCE_API)),
+        vol.Optional("file_path"): cv.string,
+        vol.Optional("start_date"): cv.date,
+        vol.Optional("end_date"): cv.date,
+        vol.Optional("tank_id"): vol.Coerce(int),
+    }
+)
+EXPORT_PARQUET_ROW_GROUP = 10000  # rows buffered per Parquet row group
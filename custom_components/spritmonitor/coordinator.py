@@ -0,0 +1,507 @@
+"""Data update coordinators for the Spritmonitor integration."""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import timedelta
+from functools import partial
+
+import aiohttp
+
+from homeassistant import config_entries
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.const import UnitOfEnergy
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    DATA_ACCOUNTS,
+    DATA_CLIENTS,
+    API_VEHICLES_URL,
+    API_REMINDERS_URL,
+    API_FUELINGS_URL_TPL,
+    API_FRESHNESS_TTL,
+    HISTORY_PROBE_SIZE,
+    ACCOUNT_CACHE_MARGIN,
+    SCHEDULER_JITTER,
+    CONF_VEHICLE_ID,
+    CONF_APP_TOKEN,
+    CONF_BEARER_TOKEN,
+    CONF_UPDATE_INTERVAL,
+    DEFAULT_UPDATE_INTERVAL,
+    CONF_VEHICLE_TYPE,
+    CONF_CURRENCY,
+    VEHICLE_TYPE_ELECTRIC,
+    VEHICLE_TYPE_PHEV,
+    METRICS_WINDOW,
+    SIGNAL_METRICS_UPDATED,
+    WEBHOOK_REFRESH_COOLDOWN,
+)
+from .analytics import compute_analytics
+from .api import (
+    ConditionalResponseCache,
+    SpritmonitorCircuitOpenError,
+    SpritmonitorClient,
+    async_get_client,
+)
+from .history import FuelingHistory
+from .metrics import UpdateMetrics
+from .models import FuelingRow
+from .projection import project, retained_bytes
+from .scheduler import AdaptivePollScheduler
+from .snapshot import CoordinatorSnapshot, snapshot_meta
+from .statistics import StatisticsExporter
+from .windows import WindowEngine, vehicle_tanks
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SpritmonitorAccountCoordinator(DataUpdateCoordinator):
+    """Fetch the account-wide endpoints once per cycle for every vehicle of a token.
+
+    vehicles.json and reminders.json always return the whole account, so all
+    vehicle coordinators sharing the same tokens read their slice from here
+    instead of downloading both payloads on their own.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: SpritmonitorClient) -> None:
+        # The account outlives the entry that happens to create it, so it must not
+        # bind to that entry (and be shut down when it unloads).
+        token = config_entries.current_entry.set(None)
+        try:
+            super().__init__(hass, _LOGGER, name="spritmonitor_account", update_interval=None, always_update=False)
+        finally:
+            config_entries.current_entry.reset(token)
+        self.client = client
+        self.request_counts = Counter()
+        self.metrics = UpdateMetrics(METRICS_WINDOW)
+        self.responses = ConditionalResponseCache()
+        self._members: dict[int, timedelta] = {}
+        self._lock = asyncio.Lock()
+        self._fetched_at = None
+        self._max_age = API_FRESHNESS_TTL
+
+    @property
+    def cache_ttl(self) -> timedelta:
+        """Account data is reused until the fastest member is due again.
+
+        A member's polls come up to SCHEDULER_JITTER earlier than its interval,
+        so the cache must expire before the shortest jittered interval.
+        """
+        if not self._members:
+            return timedelta(0)
+        shortest = min(self._members.values()) * (1 - SCHEDULER_JITTER)
+        return max(shortest - ACCOUNT_CACHE_MARGIN, timedelta(0))
+
+    def async_add_member(self, vehicle_id: int, update_interval: timedelta) -> None:
+        self._members[vehicle_id] = update_interval
+
+    def async_remove_member(self, vehicle_id: int) -> bool:
+        """Drop a vehicle; return True when the account has no members left."""
+        self._members.pop(vehicle_id, None)
+        return not self._members
+
+    def async_invalidate(self) -> None:
+        """Force the next request to hit the API (e.g. after a write)."""
+        self._fetched_at = None
+        self._max_age = 0
+
+    async def async_get_data(self) -> dict:
+        """Return the account data, fetching it only if the cached copy is stale."""
+        async with self._lock:
+            if (
+                self.data is not None
+                and self._fetched_at is not None
+                and dt_util.utcnow() - self._fetched_at < self.cache_ttl
+            ):
+                self.request_counts["cache_hits"] += 1
+                return self.data
+            await self.async_refresh()
+            if isinstance(self.last_exception, SpritmonitorCircuitOpenError) and self.data is not None:
+                # Keep serving the cached account data until the API recovers.
+                return self.data
+            if not self.last_update_success:
+                raise UpdateFailed(f"Error fetching account data: {self.last_exception}")
+            self._fetched_at = dt_util.utcnow()
+            self._max_age = API_FRESHNESS_TTL
+            _LOGGER.debug(
+                "Spritmonitor account data refreshed for %d vehicles (requests: %s)",
+                len(self._members), dict(self.request_counts),
+            )
+            return self.data
+
+    async def _async_update_data(self) -> dict:
+        self.metrics.begin()
+        try:
+            with self.metrics.time("total"):
+                return await self._async_fetch_account()
+        finally:
+            self.metrics.commit()
+
+    async def _async_fetch_account(self) -> dict:
+        # Both endpoints are requested concurrently; reminders stay optional.
+        # Unchanged payloads keep the previous data object, so listeners are not called.
+        vehicles, reminders = await asyncio.gather(
+            self._async_fetch_vehicles(), self._async_fetch_reminders(),
+            return_exceptions=True,
+        )
+        if isinstance(vehicles, aiohttp.ClientError):
+            raise UpdateFailed(f"Connection error with Spritmonitor: {vehicles}")
+        if isinstance(vehicles, BaseException):
+            raise vehicles
+        vehicles, vehicles_changed = vehicles
+        self.metrics.add("vehicles_records", len(vehicles))
+        if isinstance(reminders, BaseException):
+            _LOGGER.debug("Could not fetch reminders: %s", reminders)
+            # The data loses its reminders, so the next copy of the same body is a change again.
+            self.responses.forget(API_REMINDERS_URL)
+            reminders, reminders_changed = None, True
+        else:
+            reminders, reminders_changed = reminders
+
+        if self.data is not None and not vehicles_changed and not reminders_changed:
+            self.request_counts["unchanged"] += 1
+            return self.data
+        if reminders is not None:
+            grouped = {}
+            for r in reminders:
+                grouped.setdefault(r.get('vehicle'), []).append(r)
+            reminders = grouped
+        return {"vehicles": {v["id"]: v for v in vehicles}, "reminders": reminders}
+
+    async def _async_fetch_vehicles(self) -> tuple[list, bool]:
+        self.request_counts["vehicles"] += 1
+        return await self.responses.async_get(
+            self.client, API_VEHICLES_URL, metrics=self.metrics, stage="vehicles", max_age=self._max_age
+        )
+
+    async def _async_fetch_reminders(self) -> tuple[list, bool]:
+        self.request_counts["reminders"] += 1
+        return await self.responses.async_get(
+            self.client, API_REMINDERS_URL, metrics=self.metrics, stage="reminders", max_age=self._max_age
+        )
+
+    def vehicle_slice(self, vehicle_id: int) -> tuple[dict | None, list | None]:
+        """Return the vehicle info and reminders belonging to one vehicle."""
+        vehicle_info = self.data["vehicles"].get(vehicle_id)
+        reminders = self.data["reminders"]
+        if reminders is not None:
+            reminders = reminders.get(vehicle_id, [])
+        return vehicle_info, reminders
+
+
+def async_get_account(hass: HomeAssistant, entry: ConfigEntry) -> SpritmonitorAccountCoordinator:
+    """Return the shared account coordinator for the entry's tokens."""
+    accounts = hass.data[DOMAIN].setdefault(DATA_ACCOUNTS, {})
+    key = (entry.data[CONF_APP_TOKEN], entry.data[CONF_BEARER_TOKEN])
+    if key not in accounts:
+        accounts[key] = SpritmonitorAccountCoordinator(hass, async_get_client(hass, *key))
+    return accounts[key]
+
+
+async def async_release_account(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Detach the entry's vehicle; shut the account down and forget it once it is unused."""
+    accounts = hass.data[DOMAIN].get(DATA_ACCOUNTS, {})
+    key = (entry.data[CONF_APP_TOKEN], entry.data[CONF_BEARER_TOKEN])
+    account = accounts.get(key)
+    if account and account.async_remove_member(entry.data[CONF_VEHICLE_ID]):
+        accounts.pop(key)
+        hass.data[DOMAIN].get(DATA_CLIENTS, {}).pop(key, None)
+        await account.async_shutdown()
+
+
+class SpritmonitorDataUpdateCoordinator(DataUpdateCoordinator):
+    """Coordinate the data of a single Spritmonitor vehicle."""
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, account: SpritmonitorAccountCoordinator) -> None:
+        self.vehicle_id = entry.data[CONF_VEHICLE_ID]
+        self.vehicle_type = entry.data.get(CONF_VEHICLE_TYPE)
+        update_interval = timedelta(hours=entry.data.get(CONF_UPDATE_INTERVAL, DEFAULT_UPDATE_INTERVAL))
+        super().__init__(
+            hass, _LOGGER, name=f"spritmonitor_{self.vehicle_id}",
+            update_interval=update_interval, always_update=False,
+        )
+        self.account = account
+        self.metrics = UpdateMetrics(METRICS_WINDOW)
+        self.history = FuelingHistory(hass, self.vehicle_id, self.metrics)
+        self.snapshot = CoordinatorSnapshot(hass, self.vehicle_id)
+        self.statistics = StatisticsExporter(hass, self.vehicle_id, entry.data.get(CONF_CURRENCY))
+        self.windows = WindowEngine()
+        self._fuelings_debouncer = Debouncer(
+            hass, _LOGGER, cooldown=WEBHOOK_REFRESH_COOLDOWN, immediate=True,
+            function=self.async_refresh_fuelings,
+        )
+        self.analytics_duration = None
+        self.scheduler = AdaptivePollScheduler(f"spritmonitor_{self.vehicle_id}", update_interval)
+        self._responses = ConditionalResponseCache()
+        # (vehicle info, reminders) self.data was computed from; the payload itself only keeps a projection.
+        self._source: tuple | None = None
+        account.async_add_member(self.vehicle_id, update_interval)
+
+    async def async_restore_snapshot(self) -> bool:
+        """Publish the persisted payload, if any, without touching the API."""
+        stored = await self.snapshot.async_load()
+        if not stored or not stored.get("vehicle"):
+            return False
+        await self.history.async_load()
+        meta = snapshot_meta(stored, self.update_interval)
+        if meta["stale"]:
+            _LOGGER.warning(
+                "Restored Spritmonitor data for vehicle %s is stale (saved at %s)",
+                self.vehicle_id, meta["snapshot_saved_at"],
+            )
+        data = self._process(stored["vehicle"], stored.get("reminders"), self.history.rows)
+        data["meta"].update(meta)
+        self.async_set_updated_data(project(data))
+        return True
+
+    async def async_metadata_first_refresh(self) -> None:
+        """Phase one of a cold start: publish data built from vehicles.json alone.
+
+        The fueling history is neither loaded nor downloaded here; the first
+        regular refresh does that (phase two) and until then the sensors that
+        need it are unavailable.
+        """
+        try:
+            await self.account.async_get_data()
+            vehicle_info, reminders = self.account.vehicle_slice(self.vehicle_id)
+            if not vehicle_info:
+                # A vehicle added after the account data was cached is not in it yet.
+                self.account.async_invalidate()
+                await self.account.async_get_data()
+                vehicle_info, reminders = self.account.vehicle_slice(self.vehicle_id)
+        except (UpdateFailed, aiohttp.ClientError) as err:
+            raise ConfigEntryNotReady(f"Error fetching Spritmonitor vehicles: {err}") from err
+        if not vehicle_info:
+            raise ConfigEntryNotReady(f"Vehicle with ID {self.vehicle_id} not found")
+        data = self._process(vehicle_info, reminders, [])
+        data["meta"]["restored_from_snapshot"] = False
+        self.async_set_updated_data(project(data))
+
+    @callback
+    def async_schedule_fuelings_refresh(self) -> None:
+        """Run async_refresh_fuelings now, or once at the end of the cooldown if one just ran."""
+        self._fuelings_debouncer.async_schedule_call()
+
+    async def async_refresh_fuelings(self) -> None:
+        """Sync only the fueling history and republish; the account data is reused as cached.
+
+        Used by the webhook: a vehicle can keep a long poll interval and still
+        show a new fueling within seconds of being told about it.
+        """
+        if self.data is None or self.account.data is None:
+            await self.async_request_refresh()
+            return
+        try:
+            # Whoever called the webhook knows of a new fueling: do not reuse a response from just before.
+            changed = await self.history.async_sync(partial(self.async_fetch_fuelings_page, max_age=0))
+        except (UpdateFailed, aiohttp.ClientError, asyncio.TimeoutError) as err:
+            _LOGGER.debug("Vehicle %s: fuelings refresh failed: %s", self.vehicle_id, err)
+            return
+        if not changed:
+            _LOGGER.debug("Vehicle %s: fuelings refresh found nothing new", self.vehicle_id)
+            return
+        vehicle_info, reminders = self.account.vehicle_slice(self.vehicle_id)
+        if not vehicle_info:
+            return
+        data = self._process(vehicle_info, reminders, self.history.rows)
+        data["meta"]["restored_from_snapshot"] = False
+        self.async_set_updated_data(project(data))
+        self._async_import_statistics(data)
+
+    async def async_shutdown(self) -> None:
+        await super().async_shutdown()
+        self._fuelings_debouncer.async_shutdown()
+
+    async def _async_update_data(self) -> dict:
+        """Fetch and process data from the API endpoint."""
+        # Failed updates retry at the configured interval.
+        self.update_interval = self.scheduler.base_interval
+        self.metrics.begin()
+        try:
+            with self.metrics.time("total"):
+                data, changed = await self._async_fetch_and_process()
+        except UpdateFailed:
+            self.metrics.add("failed", 1)
+            raise
+        finally:
+            self.metrics.commit()
+            async_dispatcher_send(self.hass, SIGNAL_METRICS_UPDATED.format(self.config_entry.entry_id))
+        last_fueling = self.history.rows[0].date if self.history.rows else None
+        self.update_interval = self.scheduler.next_interval(changed, last_fueling)
+        return data
+
+    async def _async_fetch_and_process(self) -> tuple[dict, bool]:
+        """Return the payload to publish and whether the vehicle's data really changed.
+
+        A payload rebuilt only because the day rolled over (see _is_current)
+        is not a change, so it does not start burst polling.
+        """
+        vehicle_id = self.vehicle_id
+        try:
+            # Account data and fuelings do not depend on each other.
+            results = await asyncio.gather(
+                self.metrics.async_time("account", self.account.async_get_data()),
+                self.metrics.async_time("fuelings", self.history.async_sync(self.async_fetch_fuelings_page)),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, SpritmonitorCircuitOpenError) and self.data is not None:
+                    _LOGGER.debug("Vehicle %s: API paused, keeping cached data", vehicle_id)
+                    return self.data, False
+                if isinstance(result, BaseException):
+                    raise result
+            history_changed = results[1]
+            self.metrics.add("fuelings_records", self.history.last_fetched)
+            self.metrics.add("rows", len(self.history.rows))
+            vehicle_info, reminders = self.account.vehicle_slice(vehicle_id)
+            if not vehicle_info:
+                raise UpdateFailed(f"Vehicle with ID {vehicle_id} not found")
+
+            if not history_changed and self._is_current(vehicle_info, reminders):
+                _LOGGER.debug("Vehicle %s: payload unchanged, skipping processing", vehicle_id)
+                # Equal, but possibly new objects: only keep the account's current ones alive.
+                self._source = (vehicle_info, reminders)
+                return self.data, False
+
+            changed = history_changed or self._source != (vehicle_info, reminders)
+
+            data = self._process(vehicle_info, reminders, self.history.rows)
+            self.snapshot.async_save(vehicle_info, reminders)
+            data["meta"]["restored_from_snapshot"] = False
+            if history_changed or not self.statistics.synced:
+                self._async_import_statistics(data)
+            published = project(data)
+            self.metrics.add("payload_bytes", retained_bytes(published))
+            return published, changed
+        except UpdateFailed:
+            raise
+        except aiohttp.ClientError as e:
+            raise UpdateFailed(f"Connection error with Spritmonitor: {e}")
+        except Exception as e:
+            _LOGGER.exception("Unexpected error fetching Spritmonitor data")
+            raise UpdateFailed(f"Error fetching data from Spritmonitor: {e}")
+
+    @callback
+    def _async_import_statistics(self, data: dict) -> None:
+        """Import from the full payload (with the tank lists), not the published projection."""
+        self.config_entry.async_create_background_task(
+            self.hass, self.statistics.async_import(data, self.vehicle_type),
+            f"spritmonitor_{self.vehicle_id}_statistics",
+        )
+
+    def _is_current(self, vehicle_info: dict, reminders: list | None) -> bool:
+        """Whether self.data was built today, from live data, out of this same slice."""
+        if self.data is None:
+            return False
+        meta = self.data["meta"]
+        return (
+            not meta.get("restored_from_snapshot")
+            and meta.get("history_ready")
+            and meta.get("computed_on") == dt_util.now().date().isoformat()
+            and self._source == (vehicle_info, reminders)
+        )
+
+    def _process(self, vehicle_info: dict, reminders: list | None, rows: list[FuelingRow]) -> dict:
+        """Build the full payload from the API payloads and the parsed fueling rows.
+
+        Callers publish project() of it; the tank lists are only needed to
+        compute the analytics and to import statistics.
+        """
+        with self.metrics.time("build"):
+            data = build_vehicle_data(vehicle_info, reminders, rows, self.vehicle_type)
+
+        start = time.perf_counter()
+        data["analytics"] = compute_analytics(data, self.vehicle_type)
+        self.analytics_duration = time.perf_counter() - start
+        self.metrics.add("analytics_ms", self.analytics_duration * 1000)
+        _LOGGER.debug("Vehicle %s: analytics computed in %.2f ms", self.vehicle_id, self.analytics_duration * 1000)
+        with self.metrics.time("windows"):
+            data["analytics"].update(self.windows.update(
+                vehicle_tanks(data, self.vehicle_type), dt_util.now().date(), self.history.revision
+            ))
+        if self.vehicle_type in (VEHICLE_TYPE_ELECTRIC, VEHICLE_TYPE_PHEV):
+            # Month bucket of the charging tank's period index.
+            suffix = "_electric" if self.vehicle_type == VEHICLE_TYPE_PHEV else ""
+            data["analytics"]["monthly_energy_charged"] = data["analytics"][f"period_quantity_month{suffix}"]
+        data["meta"] = {
+            "analytics_duration": round(self.analytics_duration, 6),
+            "computed_on": dt_util.now().date().isoformat(),
+            "history_ready": self.history.ready,
+        }
+        self._source = (vehicle_info, reminders)
+        return data
+
+    async def async_fetch_fuelings_page(self, limit: int, offset: int, max_age: float = API_FRESHNESS_TTL) -> list:
+        """One page of the vehicle's fuelings.json records, newest first (a FetchPage).
+
+        Used by the history sync and by exports that page through the API.
+        """
+        fuelings_url = API_FUELINGS_URL_TPL.format(vehicle_id=self.vehicle_id)
+        params = {"limit": limit, "offset": offset}
+        if offset == 0 and limit == HISTORY_PROBE_SIZE:
+            # Only the small polling probe is cached; history pages are not kept twice.
+            page, _ = await self._responses.async_get(
+                self.account.client, fuelings_url, params, metrics=self.metrics, stage="fuelings", max_age=max_age
+            )
+            return page
+        return await self.account.client.async_get_json(
+            fuelings_url, params, metrics=self.metrics, stage="fuelings", max_age=max_age
+        )
+
+
+def build_vehicle_data(vehicle_info: dict, reminders: list | None, rows: list[FuelingRow], vehicle_type: str) -> dict:
+    """Split the history per tank and assemble the payload compute_analytics() reads."""
+    trip_unit = vehicle_info.get("tripunit")
+    if vehicle_type == VEHICLE_TYPE_ELECTRIC:
+        quantity_unit = UnitOfEnergy.KILO_WATT_HOUR
+    else:
+        quantity_unit = "L" if trip_unit == "km" else "gal"
+    quantity_unit = vehicle_info.get("quantityunit", quantity_unit)
+    consumption_unit_raw = vehicle_info.get("consumptionunit", "")
+    consumption_unit = consumption_unit_raw.replace('km/l', 'km/L').replace('l/100km', 'L/100km')
+    units = {"trip": trip_unit, "quantity": quantity_unit, "consumption": consumption_unit}
+
+    # --- LÓGICA DE SEPARACIÓN MEJORADA ---
+    gas_refuelings = []
+    electric_charges = []
+
+    # Las filas ya vienen ordenadas de la más nueva a la más antigua.
+    if vehicle_type == VEHICLE_TYPE_ELECTRIC:
+        # Si es un EV puro, todos los registros son eléctricos.
+        electric_charges = rows
+    else:
+        # Para Combustión y PHEV, filtramos por tankid.
+        gas_refuelings = tank_rows(rows, 1)
+        electric_charges = tank_rows(rows, 2)
+    # --- FIN DE LA LÓGICA ---
+
+    last_gas_refueling = gas_refuelings[0] if gas_refuelings else None
+    last_electric_charge = electric_charges[0] if electric_charges else None
+
+    # Para compatibilidad, 'refuelings' es la lista principal del vehículo
+    if vehicle_type == VEHICLE_TYPE_ELECTRIC:
+        refuelings = electric_charges
+    else:
+        refuelings = gas_refuelings
+    last_refueling = refuelings[0] if refuelings else None
+
+    return {
+        "vehicle": vehicle_info, "units": units, "last_refueling": last_refueling,
+        "refuelings": refuelings, "gas_refuelings": gas_refuelings,
+        "last_gas_refueling": last_gas_refueling, "electric_charges": electric_charges,
+        "last_electric_charge": last_electric_charge, "reminders": reminders,
+    }
+
+
+def tank_rows(rows: list[FuelingRow], tank_id: int) -> list[FuelingRow]:
+    """Rows of one tank, newest first; `rows` itself rather than a copy when they all belong to it."""
+    if all(r.tank_id == tank_id for r in rows):
+        return rows
+    return [r for r in rows if r.tank_id == tank_id]
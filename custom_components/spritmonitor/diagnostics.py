@@ -0,0 +1,55 @@
+"""Diagnostics support for Spritmonitor."""
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, DATA_QUEUE, DATA_FLEET, CONF_APP_TOKEN, CONF_BEARER_TOKEN, CONF_FLEET, CONF_WEBHOOK_ID
+from .projection import retained_bytes
+
+TO_REDACT = {CONF_APP_TOKEN, CONF_BEARER_TOKEN, CONF_WEBHOOK_ID, "sign"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return the update metrics and client state of a config entry."""
+    if entry.data.get(CONF_FLEET):
+        return {"entry": entry.as_dict(), "fleet": hass.data[DOMAIN][DATA_FLEET].data}
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    account = coordinator.account
+    queue = hass.data[DOMAIN][DATA_QUEUE]
+    data = coordinator.data or {}
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "update": {
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            "meta": data.get("meta"),
+            "metrics": coordinator.metrics.as_dict(),
+            "scheduler_decisions": list(coordinator.scheduler.decisions),
+        },
+        "account": {
+            "cache_ttl": account.cache_ttl.total_seconds(),
+            "request_counts": dict(account.request_counts),
+            "metrics": account.metrics.as_dict(),
+        },
+        "client": {
+            # get_misses went to the API; get_inflight_hits / get_fresh_hits were shared or reused.
+            "stats": dict(account.client.stats),
+            "circuit": account.client.breaker.state,
+        },
+        "history": {
+            "rows": len(coordinator.history.rows),
+            "last_fetched": coordinator.history.last_fetched,
+        },
+        "windows": coordinator.windows.as_dict(),
+        "memory": {
+            # Bytes kept alive per vehicle: the published payload and the synced history.
+            "payload_bytes": retained_bytes(coordinator.data),
+            "history_bytes": retained_bytes(coordinator.history.fuelings, coordinator.history.rows),
+        },
+        "queue": {
+            "depth": queue.depth(entry.entry_id),
+            "oldest_age": queue.oldest_age(entry.entry_id),
+        },
+        "vehicle": async_redact_data(data.get("vehicle") or {}, TO_REDACT),
+    }
@@ -0,0 +1,199 @@
+"""Streaming export of a vehicle's fueling history to CSV, JSON Lines or Parquet.
+
+The export is a generator pipeline: a source yields pages of FuelingRow (from
+the API, HISTORY_PAGE_SIZE records per request, or from the local history),
+select_rows() filters each page by date and tank, and a writer appends the
+page to the file in the executor. Only one page is held at a time, plus the
+current row group for Parquet.
+
+Parquet needs pyarrow, which is not a requirement of this integration: it is
+used when Home Assistant happens to have it installed, otherwise that format
+is refused.
+"""
+
+import csv
+import json
+import os
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from dataclasses import fields
+from datetime import date
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional
+    pa = pq = None
+
+from homeassistant.core import HomeAssistant
+
+from .const import EXPORT_PARQUET_ROW_GROUP, HISTORY_PAGE_SIZE
+from .history import FetchPage
+from .models import FuelingRow
+
+COLUMNS = tuple(field.name for field in fields(FuelingRow))
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+async def async_api_pages(fetch_page: FetchPage) -> AsyncIterator[list[FuelingRow]]:
+    """Every fueling of the vehicle, one API page at a time (newest first, as the API returns them)."""
+    offset = 0
+    while True:
+        page = await fetch_page(HISTORY_PAGE_SIZE, offset)
+        yield [row for raw in page if (row := FuelingRow.from_api(raw)) is not None]
+        if len(page) < HISTORY_PAGE_SIZE:
+            return
+        offset += HISTORY_PAGE_SIZE
+
+
+async def async_cached_pages(rows: list[FuelingRow]) -> AsyncIterator[list[FuelingRow]]:
+    """The synced history in pages of HISTORY_PAGE_SIZE rows."""
+    for start in range(0, len(rows), HISTORY_PAGE_SIZE):
+        yield rows[start:start + HISTORY_PAGE_SIZE]
+
+
+def select_rows(
+    rows: Iterable[FuelingRow], start: date | None, end: date | None, tank_id: int | None,
+) -> Iterator[FuelingRow]:
+    """Rows dated within [start, end] (both optional and inclusive) of the given tank, if any."""
+    for row in rows:
+        if (start and row.date < start) or (end and row.date > end):
+            continue
+        if tank_id is not None and row.tank_id != tank_id:
+            continue
+        yield row
+
+
+def _record(row: FuelingRow) -> dict:
+    record = {name: getattr(row, name) for name in COLUMNS}
+    record["date"] = row.date.isoformat()
+    return record
+
+
+class _CsvWriter:
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMNS)
+        self._writer.writeheader()
+
+    def write(self, rows: list[FuelingRow]) -> None:
+        self._writer.writerows(_record(row) for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _JsonLinesWriter:
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows: list[FuelingRow]) -> None:
+        self._file.writelines(json.dumps(_record(row), ensure_ascii=False) + "\n" for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Buffers rows into row groups of EXPORT_PARQUET_ROW_GROUP rows; API pages are far smaller."""
+
+    def __init__(self, path: str) -> None:
+        self._schema = pa.schema([
+            ("id", pa.int64()),
+            ("date", pa.date32()),
+            ("odometer", pa.float64()),
+            ("trip", pa.float64()),
+            ("quantity", pa.float64()),
+            ("cost", pa.float64()),
+            ("consumption", pa.float64()),
+            ("tank_id", pa.int64()),
+            ("type", pa.string()),
+            ("location", pa.string()),
+            ("country", pa.string()),
+            ("price_per_unit", pa.float64()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._pending: list[FuelingRow] = []
+
+    def write(self, rows: list[FuelingRow]) -> None:
+        self._pending.extend(rows)
+        if len(self._pending) >= EXPORT_PARQUET_ROW_GROUP:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            columns = {name: [getattr(row, name) for row in self._pending] for name in COLUMNS}
+            self._writer.write_table(pa.table(columns, schema=self._schema))
+            self._pending = []
+
+    def close(self) -> None:
+        try:
+            self._flush()
+        finally:
+            self._writer.close()
+
+
+WRITERS = {"csv": _CsvWriter, "jsonl": _JsonLinesWriter, "parquet": _ParquetWriter}
+
+
+async def async_export(
+    hass: HomeAssistant,
+    pages: AsyncIterator[list[FuelingRow]],
+    path: str,
+    export_format: str,
+    start: date | None = None,
+    end: date | None = None,
+    tank_id: int | None = None,
+) -> dict:
+    """Write the selected rows of `pages` to `path` and return the export's figures.
+
+    The file is written next to `path` first and only moved into place once
+    complete, so a failed export never leaves a truncated file behind. Pages
+    are newest first: the first page that ends before `start` is the last
+    one requested.
+    """
+    partial_path = f"{path}.part"
+    started = time.monotonic()
+    writer = await hass.async_add_executor_job(WRITERS[export_format], partial_path)
+    exported = read = 0
+    try:
+        async for page in pages:
+            read += len(page)
+            selected = list(select_rows(page, start, end, tank_id))
+            if selected:
+                await hass.async_add_executor_job(writer.write, selected)
+                exported += len(selected)
+            if start and page and page[-1].date < start:
+                break
+        await hass.async_add_executor_job(writer.close)
+        await hass.async_add_executor_job(os.replace, partial_path, path)
+    except BaseException:
+        await hass.async_add_executor_job(_discard, writer, partial_path)
+        raise
+    finally:
+        await pages.aclose()
+
+    seconds = time.monotonic() - started
+    return {
+        "path": path,
+        "format": export_format,
+        "rows": exported,
+        "rows_read": read,
+        "bytes": await hass.async_add_executor_job(os.path.getsize, path),
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(exported / seconds) if seconds > 0 else None,
+    }
+
+
+def _discard(writer, path: str) -> None:
+    try:
+        writer.close()
+    except Exception:  # noqa: BLE001 - the export already failed
+        pass
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,152 @@
+"""Fleet-wide figures reduced from the data of every loaded vehicle."""
+
+import logging
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from datetime import date
+
+from homeassistant.const import UnitOfLength
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util import dt as dt_util
+from homeassistant.util.unit_conversion import DistanceConverter
+
+from .const import (
+    CONF_CURRENCY,
+    FLEET_RECOMPUTE_COOLDOWN,
+    SIGNAL_FLEET_UPDATED,
+    VEHICLE_TYPE_ELECTRIC,
+    VEHICLE_TYPE_PHEV,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+_DISTANCE_UNITS = {UnitOfLength.KILOMETERS, UnitOfLength.MILES}
+
+
+def _service_overdue(analytics: dict, today: date) -> bool:
+    if analytics.get("km_to_next_service") == 0:
+        return True
+    service_date = analytics.get("next_service_date")
+    return isinstance(service_date, date) and service_date < today
+
+
+def reduce_fleet(coordinators, today: date) -> dict:
+    """Fleet totals from the vehicles' latest data, in one pass.
+
+    Monthly cost and the consumption averages cannot be added up across
+    currencies or consumption units, so each one covers the vehicles of the
+    most common unit; `attributes` tells how many vehicles that is.
+    Consumptions are averaged weighted by the vehicles' total distance, with
+    PHEVs counted as fuel vehicles (Spritmonitor's average is the main tank's).
+    """
+    vehicles = 0
+    distance_km = 0.0
+    costs: dict[str | None, float] = defaultdict(float)
+    cost_vehicles: Counter = Counter()
+    # kind -> unit -> [consumption x distance, distance, vehicles]
+    consumption = {"fuel": defaultdict(lambda: [0.0, 0.0, 0]), "electric": defaultdict(lambda: [0.0, 0.0, 0])}
+    overdue = []
+
+    for coordinator in coordinators:
+        data = coordinator.data
+        if not data:
+            continue
+        vehicles += 1
+        analytics, units = data["analytics"], data["units"]
+        suffixes = ("_fuel", "_electric") if coordinator.vehicle_type == VEHICLE_TYPE_PHEV else ("",)
+
+        month_costs = [analytics.get(f"period_cost_month{suffix}") for suffix in suffixes]
+        if any(cost is not None for cost in month_costs):
+            currency = coordinator.config_entry.data.get(CONF_CURRENCY)
+            costs[currency] += sum(cost or 0.0 for cost in month_costs)
+            cost_vehicles[currency] += 1
+
+        distance = analytics.get("total_distance") or 0.0
+        trip_unit = units.get("trip")
+        if distance and trip_unit in _DISTANCE_UNITS:
+            distance = DistanceConverter.convert(distance, trip_unit, UnitOfLength.KILOMETERS)
+            distance_km += distance
+        else:
+            distance = 0.0
+
+        if coordinator.vehicle_type == VEHICLE_TYPE_ELECTRIC:
+            kind, average, unit = "electric", analytics.get("avg_energy_consumption"), f"kWh/100{trip_unit or 'km'}"
+        else:
+            kind, average, unit = "fuel", analytics.get("avg_consumption"), units.get("consumption")
+        if average and distance:
+            bucket = consumption[kind][unit]
+            bucket[0] += average * distance
+            bucket[1] += distance
+            bucket[2] += 1
+
+        if _service_overdue(analytics, today):
+            overdue.append(analytics.get("brand_model") or str(coordinator.vehicle_id))
+
+    result = {
+        "vehicles": vehicles,
+        "total_distance": round(distance_km, 1) if vehicles else None,
+        "service_overdue": len(overdue) if vehicles else None,
+        "units": {},
+        "attributes": {"service_overdue": {"vehicles": overdue}},
+    }
+    if cost_vehicles:
+        currency, count = cost_vehicles.most_common(1)[0]
+        result["monthly_cost"] = round(costs[currency], 2)
+        result["units"]["monthly_cost"] = currency
+        result["attributes"]["monthly_cost"] = {"vehicles": count}
+    else:
+        result["monthly_cost"] = None
+    for kind, by_unit in consumption.items():
+        key = f"avg_consumption_{kind}"
+        if not by_unit:
+            result[key] = None
+            continue
+        unit, (weighted, weight, count) = max(by_unit.items(), key=lambda item: item[1][2])
+        result[key] = round(weighted / weight, 2)
+        result["units"][key] = unit
+        result["attributes"][key] = {"vehicles": count}
+    return result
+
+
+class FleetAggregator:
+    """Keep the fleet figures of every loaded vehicle coordinator up to date.
+
+    Vehicle coordinators only call their listeners when their data actually
+    changed, so the fleet is recomputed once per real change (coalesced over
+    FLEET_RECOMPUTE_COOLDOWN, as an account refresh updates every vehicle at
+    once) and never on entity state writes.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self.data: dict = {}
+        self._members: dict[str, object] = {}
+        self._unsubscribe: dict[str, Callable[[], None]] = {}
+        self._debouncer = Debouncer(
+            hass, _LOGGER, cooldown=FLEET_RECOMPUTE_COOLDOWN, immediate=False,
+            function=self._async_recompute,
+        )
+
+    @callback
+    def async_add(self, entry_id: str, coordinator) -> None:
+        self._members[entry_id] = coordinator
+        self._unsubscribe[entry_id] = coordinator.async_add_listener(self._debouncer.async_schedule_call)
+        self._debouncer.async_schedule_call()
+
+    @callback
+    def async_remove(self, entry_id: str) -> None:
+        if self._members.pop(entry_id, None) is None:
+            return
+        self._unsubscribe.pop(entry_id)()
+        self._debouncer.async_schedule_call()
+
+    @callback
+    def async_stop(self) -> None:
+        self._debouncer.async_cancel()
+
+    @callback
+    def _async_recompute(self) -> None:
+        self.data = reduce_fleet(self._members.values(), dt_util.now().date())
+        async_dispatcher_send(self.hass, SIGNAL_FLEET_UPDATED)
@@ -0,0 +1,147 @@
+"""Persistent, incrementally synced fueling history for a Spritmonitor vehicle."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    HISTORY_STORAGE_VERSION,
+    HISTORY_PAGE_SIZE,
+    HISTORY_PROBE_SIZE,
+    HISTORY_FULL_RESYNC_INTERVAL,
+)
+from .metrics import NO_METRICS, UpdateMetrics
+from .models import FuelingRow
+
+_LOGGER = logging.getLogger(__name__)
+
+FetchPage = Callable[[int, int], Awaitable[list]]
+
+
+def _to_rows(fuelings: list[dict]) -> list[FuelingRow]:
+    """Parse raw records into rows, newest first; records without a valid date are dropped."""
+    rows = [row for f in fuelings if (row := FuelingRow.from_api(f)) is not None]
+    rows.sort(key=lambda r: r.sort_key, reverse=True)
+    return rows
+
+
+def history_store(hass: HomeAssistant, vehicle_id) -> Store:
+    return Store(hass, HISTORY_STORAGE_VERSION, f"{DOMAIN}.history_{vehicle_id}")
+
+
+class FuelingHistory:
+    """Complete fueling history of one vehicle, kept in a Home Assistant Store.
+
+    The first sync pages through every record; later syncs only request the
+    newest page(s) until a known fueling id shows up, so an unchanged vehicle
+    costs a single request of HISTORY_PROBE_SIZE rows.
+
+    `fuelings` holds the raw records as stored; `rows` holds the parsed
+    FuelingRow objects, newest first. Each record is parsed only once.
+    `ready` turns True once the history is usable:
+    loaded from a non-empty store or synced with the API. `revision` changes
+    whenever the rows are replaced rather than extended with new fuelings.
+    """
+
+    def __init__(self, hass: HomeAssistant, vehicle_id, metrics: UpdateMetrics = NO_METRICS) -> None:
+        self._store = history_store(hass, vehicle_id)
+        self._metrics = metrics
+        self.vehicle_id = vehicle_id
+        self.fuelings: list[dict] = []
+        self.rows: list[FuelingRow] = []
+        self.last_fetched = 0
+        self._ids: set = set()
+        self._full_sync_at: datetime | None = None
+        self._loaded = False
+        self.ready = False
+        self.revision = 0
+        self._sync_lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        if self._loaded:
+            return
+        stored = await self._store.async_load()
+        if stored:
+            self.fuelings = stored.get("fuelings", [])
+            self._ids = {f.get('id') for f in self.fuelings}
+            self._full_sync_at = dt_util.parse_datetime(stored.get("full_sync_at") or "")
+            self.rows = _to_rows(self.fuelings)
+            self.revision += 1
+            self.ready = True
+        self._loaded = True
+
+    async def async_sync(self, fetch_page: FetchPage) -> bool:
+        """Bring the history up to date; return True if it changed.
+
+        Concurrent syncs (a scheduled update and a webhook refresh) run one
+        after the other; the second one then usually finds nothing new.
+        """
+        async with self._sync_lock:
+            await self.async_load()
+            changed = await self._async_sync(fetch_page)
+            self.ready = True
+            return changed
+
+    async def _async_sync(self, fetch_page: FetchPage) -> bool:
+        if (
+            self._full_sync_at is None
+            or dt_util.utcnow() - self._full_sync_at > HISTORY_FULL_RESYNC_INTERVAL
+        ):
+            return await self._async_full_sync(fetch_page)
+
+        new, offset, limit = [], 0, HISTORY_PROBE_SIZE
+        self.last_fetched = 0
+        while True:
+            page = await fetch_page(limit, offset)
+            self.last_fetched += len(page)
+            fresh = [f for f in page if f.get('id') not in self._ids]
+            new.extend(fresh)
+            if len(fresh) < len(page) or len(page) < limit:
+                break
+            offset += limit
+            limit = HISTORY_PAGE_SIZE
+
+        if not new:
+            return False
+        _LOGGER.debug("Vehicle %s: %d new fuelings synced", self.vehicle_id, len(new))
+        self.fuelings = new + self.fuelings
+        with self._metrics.time("parse"):
+            self.rows = sorted(self.rows + _to_rows(new), key=lambda r: r.sort_key, reverse=True)
+        self._ids.update(f.get('id') for f in new)
+        await self._async_save()
+        return True
+
+    async def _async_full_sync(self, fetch_page: FetchPage) -> bool:
+        """Download every page; also picks up edits and deletions."""
+        fuelings, offset = [], 0
+        while True:
+            page = await fetch_page(HISTORY_PAGE_SIZE, offset)
+            fuelings.extend(page)
+            if len(page) < HISTORY_PAGE_SIZE:
+                break
+            offset += HISTORY_PAGE_SIZE
+        self.last_fetched = len(fuelings)
+        _LOGGER.debug("Vehicle %s: full history sync fetched %d fuelings", self.vehicle_id, len(fuelings))
+
+        changed = fuelings != self.fuelings
+        self.fuelings = fuelings
+        if changed:
+            with self._metrics.time("parse"):
+                self.rows = _to_rows(fuelings)
+            self.revision += 1
+        self._ids = {f.get('id') for f in fuelings}
+        self._full_sync_at = dt_util.utcnow()
+        await self._async_save()
+        return changed
+
+    async def _async_save(self) -> None:
+        await self._store.async_save({
+            "fuelings": self.fuelings,
+            "full_sync_at": self._full_sync_at.isoformat() if self._full_sync_at else None,
+        })
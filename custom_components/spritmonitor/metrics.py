@@ -0,0 +1,73 @@
+"""Per-stage timings, byte counts and record counts of coordinator updates."""
+
+import math
+import time
+from collections import deque
+from collections.abc import Awaitable
+from contextlib import contextmanager
+from typing import Any
+
+
+class UpdateMetrics:
+    """Collect the figures of one update at a time and keep the last `window` updates.
+
+    begin() opens an update; add() and time() accumulate into it (a stage
+    measured twice, e.g. several fuelings pages, is summed); commit() closes
+    it. Outside begin()/commit() nothing is recorded, so instrumented code
+    can run unconditionally. Durations are in milliseconds (`<stage>_ms`).
+    """
+
+    def __init__(self, window: int) -> None:
+        self._updates: deque[dict] = deque(maxlen=window)
+        self._current: dict | None = None
+        self.last: dict = {}
+
+    def begin(self) -> None:
+        self._current = {}
+
+    def add(self, name: str, value: float) -> None:
+        if self._current is not None:
+            self._current[name] = self._current.get(name, 0) + value
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(f"{stage}_ms", (time.perf_counter() - start) * 1000)
+
+    async def async_time(self, stage: str, awaitable: Awaitable) -> Any:
+        with self.time(stage):
+            return await awaitable
+
+    def commit(self) -> None:
+        if self._current is None:
+            return
+        self.last = {k: round(v, 3) if isinstance(v, float) else v for k, v in self._current.items()}
+        self._updates.append(self.last)
+        self._current = None
+
+    def percentiles(self, name: str) -> dict | None:
+        """Nearest-rank p50/p90/p99 and max of `name` over the kept updates."""
+        values = sorted(u[name] for u in self._updates if name in u)
+        if not values:
+            return None
+
+        def rank(p: float):
+            return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+        return {"p50": rank(50), "p90": rank(90), "p99": rank(99), "max": values[-1], "samples": len(values)}
+
+    def as_dict(self) -> dict:
+        names = sorted({name for update in self._updates for name in update})
+        return {
+            "window": self._updates.maxlen,
+            "updates": len(self._updates),
+            "last": self.last,
+            "percentiles": {name: self.percentiles(name) for name in names},
+        }
+
+
+# Sink for calls made outside an instrumented update.
+NO_METRICS = UpdateMetrics(0)
@@ -0,0 +1,64 @@
+"""Typed records for Spritmonitor API payloads."""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+
+API_DATE_FORMAT = '%d.%m.%Y'
+
+
+def _float(value) -> float | None:
+    try:
+        return float(value) if value is not None and value != '' else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(slots=True, frozen=True)
+class FuelingRow:
+    """One fueling/charge, parsed once when it enters the integration."""
+
+    id: int | None
+    date: date
+    odometer: float | None
+    trip: float | None
+    quantity: float | None
+    cost: float | None
+    consumption: float | None
+    tank_id: int | None
+    type: str | None
+    location: str | None
+    country: str | None
+    price_per_unit: float | None
+
+    @property
+    def date_str(self) -> str:
+        """Date in the API's own format, as shown by the sensors."""
+        return self.date.strftime(API_DATE_FORMAT)
+
+    @property
+    def sort_key(self) -> tuple:
+        return self.date, self.id or 0
+
+    @classmethod
+    def from_api(cls, raw: dict) -> "FuelingRow | None":
+        """Build a row from a fuelings.json record; None if it has no valid date."""
+        try:
+            parsed_date = datetime.strptime(raw['date'], API_DATE_FORMAT).date()
+        except (KeyError, TypeError, ValueError):
+            return None
+        quantity = _float(raw.get('quantity'))
+        cost = _float(raw.get('cost'))
+        return cls(
+            id=raw.get('id'),
+            date=parsed_date,
+            odometer=_float(raw.get('odometer')),
+            trip=_float(raw.get('trip')),
+            quantity=quantity,
+            cost=cost,
+            consumption=_float(raw.get('consumption')),
+            tank_id=raw.get('tankid'),
+            type=raw.get('type'),
+            location=raw.get('location'),
+            country=raw.get('country'),
+            price_per_unit=round(cost / quantity, 3) if cost and quantity else None,
+        )
@@ -0,0 +1,79 @@
+"""Calendar-period totals of a fueling history: one bucket per month and per year.
+
+A PeriodIndex belongs to one tank. Fuelings are added one at a time (see
+windows.WindowEngine, which feeds both), so the month-to-date, previous-month
+and year-to-date figures are dict lookups instead of scans of the history.
+"""
+
+from datetime import date
+
+from .models import FuelingRow
+
+PERIODS = ("month", "previous_month", "year")
+PERIOD_METRICS = ("quantity", "cost", "distance", "fuelings")
+
+
+class _Bucket:
+    __slots__ = ("quantity", "cost", "distance", "fuelings")
+
+    def __init__(self) -> None:
+        self.quantity = 0.0
+        self.cost = 0.0
+        self.distance = 0.0
+        self.fuelings = 0
+
+    def add(self, row: FuelingRow) -> None:
+        self.quantity += row.quantity or 0.0
+        self.cost += row.cost or 0.0
+        self.distance += row.trip or 0.0
+        self.fuelings += 1
+
+    def values(self) -> dict:
+        return {
+            "quantity": round(self.quantity, 2),
+            "cost": round(self.cost, 2),
+            "distance": round(self.distance, 1),
+            "fuelings": self.fuelings,
+        }
+
+
+_EMPTY = _Bucket()
+
+
+class PeriodIndex:
+    """Sums of quantity, cost and trip plus counts keyed by (year, month) and by year."""
+
+    __slots__ = ("_months", "_years")
+
+    def __init__(self) -> None:
+        self._months: dict[tuple[int, int], _Bucket] = {}
+        self._years: dict[int, _Bucket] = {}
+
+    def __len__(self) -> int:
+        return len(self._months)
+
+    def push(self, row: FuelingRow) -> None:
+        key = (row.date.year, row.date.month)
+        month = self._months.get(key)
+        if month is None:
+            month = self._months[key] = _Bucket()
+        year = self._years.get(key[0])
+        if year is None:
+            year = self._years[key[0]] = _Bucket()
+        month.add(row)
+        year.add(row)
+
+    def values(self, today: date) -> dict[str, dict | None]:
+        """Totals of this month, the previous month and this year, as seen on `today`.
+
+        All None while the tank has no fuelings at all; zeros for a period
+        without fuelings.
+        """
+        if not self._months:
+            return dict.fromkeys(PERIODS)
+        previous = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+        return {
+            "month": self._months.get((today.year, today.month), _EMPTY).values(),
+            "previous_month": self._months.get(previous, _EMPTY).values(),
+            "year": self._years.get(today.year, _EMPTY).values(),
+        }
@@ -0,0 +1,53 @@
+"""What a vehicle's coordinator.data keeps once an update has been processed.
+
+build_vehicle_data() assembles everything compute_analytics() and the window
+engine read: the raw vehicle record, the reminders and the fuelings of every
+tank. After that the entities, the fleet and the diagnostics only read the
+vehicle's name, the units, the analytics and the meta block, so project()
+keeps just those. The fuelings stay in
+FuelingHistory, which is their only long-lived copy.
+
+retained_bytes() measures what such a structure keeps alive.
+"""
+
+import sys
+from collections import deque
+
+# The vehicle record fields read after processing (device name and model).
+PUBLISHED_VEHICLE_FIELDS = ("id", "make", "model")
+
+
+def project(data: dict) -> dict:
+    """The published payload: the analytics plus what the entities read besides them."""
+    vehicle = data.get("vehicle") or {}
+    return {
+        "vehicle": {field: vehicle[field] for field in PUBLISHED_VEHICLE_FIELDS if field in vehicle},
+        "units": data["units"],
+        "analytics": data["analytics"],
+        "meta": data["meta"],
+    }
+
+
+def retained_bytes(*roots) -> int:
+    """sys.getsizeof of `roots` and everything reachable from them, each object counted once.
+
+    Follows dict keys and values, the items of lists, tuples, sets and
+    deques, and __slots__ attributes (FuelingRow).
+    """
+    seen: set[int] = set()
+    stack = list(roots)
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            stack.extend(obj)
+        else:
+            stack.extend(getattr(obj, name, None) for name in getattr(type(obj), "__slots__", ()))
+    return total
@@ -0,0 +1,85 @@
+"""Adaptive poll scheduling for Spritmonitor vehicle coordinators."""
+
+import hashlib
+import logging
+from collections import deque
+from datetime import date, timedelta
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    SCHEDULER_JITTER,
+    SCHEDULER_IDLE_AFTER,
+    SCHEDULER_MAX_BACKOFF,
+    SCHEDULER_MAX_INTERVAL,
+    SCHEDULER_BURST_INTERVAL,
+    SCHEDULER_BURST_POLLS,
+    SCHEDULER_DECISION_LOG,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _fraction(*parts) -> float:
+    """Deterministic pseudo-random number in [0, 1) derived from the given parts."""
+    digest = hashlib.sha256(":".join(str(p) for p in parts).encode()).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+class AdaptivePollScheduler:
+    """Choose the next poll interval of one vehicle.
+
+    - The first interval after setup is stretched by a per-entry phase so entries
+      created together do not keep polling in lockstep.
+    - Every interval gets a deterministic +/- SCHEDULER_JITTER.
+    - Vehicles without a new fueling for SCHEDULER_IDLE_AFTER back off, doubling
+      per idle period up to SCHEDULER_MAX_BACKOFF times the base interval.
+    - After a write or a detected change a few polls run at SCHEDULER_BURST_INTERVAL.
+
+    Every decision is logged and kept in `decisions` for auditing.
+    """
+
+    def __init__(self, key: str, base_interval: timedelta) -> None:
+        self.key = key
+        self.base_interval = base_interval
+        self.decisions: deque = deque(maxlen=SCHEDULER_DECISION_LOG)
+        self._cycle = 0
+        self._burst_remaining = 0
+
+    def async_start_burst(self, reason: str) -> None:
+        self._burst_remaining = SCHEDULER_BURST_POLLS
+        _LOGGER.debug("%s: burst polling started (%s)", self.key, reason)
+
+    def next_interval(self, changed: bool, last_fueling: date | None) -> timedelta:
+        """Return the interval until the next poll after a successful update."""
+        self._cycle += 1
+        if changed and self._cycle > 1:
+            self._burst_remaining = max(self._burst_remaining, SCHEDULER_BURST_POLLS)
+
+        if self._burst_remaining:
+            self._burst_remaining -= 1
+            return self._decide(SCHEDULER_BURST_INTERVAL, "burst")
+
+        factor, reason = 1, "base"
+        if last_fueling is not None:
+            idle = dt_util.now().date() - last_fueling
+            if idle >= SCHEDULER_IDLE_AFTER:
+                factor = min(2 ** (idle // SCHEDULER_IDLE_AFTER), SCHEDULER_MAX_BACKOFF)
+                reason = f"idle {idle.days} days"
+
+        jitter = (_fraction(self.key, self._cycle) * 2 - 1) * SCHEDULER_JITTER
+        interval = self.base_interval * factor * (1 + jitter)
+        if self._cycle == 1:
+            interval += self.base_interval * _fraction(self.key)
+            reason += ", initial phase"
+        return self._decide(min(interval, SCHEDULER_MAX_INTERVAL), reason)
+
+    def _decide(self, interval: timedelta, reason: str) -> timedelta:
+        interval = timedelta(seconds=round(interval.total_seconds()))
+        self.decisions.append({
+            "at": dt_util.utcnow().isoformat(),
+            "interval": interval.total_seconds(),
+            "reason": reason,
+        })
+        _LOGGER.debug("%s: next poll in %s (%s)", self.key, interval, reason)
+        return interval
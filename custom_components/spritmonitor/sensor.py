@@ -1,317 +1,300 @@
 # Contenido para: sensor.py
 
 import logging
-from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.entity import DeviceInfo
-from homeassistant.const import UnitOfEnergy
-from datetime import datetime
+from homeassistant.const import EntityCategory, UnitOfEnergy, UnitOfInformation, UnitOfLength, UnitOfTime
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.event import async_track_time_interval
 
 from .const import (
-    DOMAIN, MANUFACTURER, CONF_VEHICLE_TYPE, CONF_CURRENCY, 
-    CONF_VEHICLE_ID, VEHICLE_TYPE_COMBUSTION, VEHICLE_TYPE_ELECTRIC, VEHICLE_TYPE_PHEV
+    DOMAIN, MANUFACTURER, CONF_VEHICLE_TYPE, CONF_CURRENCY,
+    CONF_VEHICLE_ID, VEHICLE_TYPE_COMBUSTION, VEHICLE_TYPE_ELECTRIC, VEHICLE_TYPE_PHEV,
+    DATA_QUEUE, QUEUE_AGE_UPDATE_INTERVAL, SIGNAL_QUEUE_UPDATED, SIGNAL_METRICS_UPDATED,
+    CONF_FLEET, DATA_FLEET, FLEET_UNIQUE_ID, SIGNAL_FLEET_UPDATED,
+    ROLLING_WINDOW_RECORDS, ROLLING_WINDOW_DAYS,
 )
+from .periods import PERIODS
+from .windows import window_name
 
 _LOGGER = logging.getLogger(__name__)
 
-def calculate_price_per_unit(cost, quantity):
-    if not cost or not quantity or float(quantity) == 0: return None
-    return round(float(cost) / float(quantity), 3)
-def format_cost(cost):
-    if cost is None: return None
-    return round(float(cost), 2)
-def get_next_service_reminder(reminders):
-    if not reminders: return None
-    incomplete_reminders = [r for r in reminders if r.get('completed') == 0]
-    if not incomplete_reminders: return None
-    return min(incomplete_reminders, key=lambda x: x.get('next_odometer', float('inf')))
-def get_next_service_date_reminder(reminders):
-    if not reminders: return None
-    incomplete_reminders = [r for r in reminders if r.get('completed') == 0 and r.get('nextdate')]
-    if not incomplete_reminders: return None
-    reminders_with_dates = []
-    for r in incomplete_reminders:
-        try:
-            date_str = r.get('nextdate')
-            if date_str:
-                parsed_date = datetime.strptime(date_str, '%d.%m.%Y').date()
-                r['parsed_date'] = parsed_date
-                reminders_with_dates.append(r)
-        except (ValueError, TypeError): pass
-    if not reminders_with_dates: return None
-    return min(reminders_with_dates, key=lambda x: x['parsed_date']).get('parsed_date')
-def calculate_km_to_service(data):
-    next_service = get_next_service_reminder(data.get('reminders', []))
-    if not next_service or not data.get('last_refueling'): return None
-    current_km = float(data['last_refueling'].get('odometer', 0))
-    service_km = next_service.get('next_odometer', 0)
-    return max(0, service_km - current_km)
-def calculate_fuel_level_estimate(data):
-    if not data.get('vehicle') or not data.get('last_gas_refueling'): return None
-    capacity = float(data['vehicle'].get('capacity', 0))
-    last_refuel_quantity = float(data['last_gas_refueling'].get('quantity', 0))
-    return min(capacity, last_refuel_quantity) if capacity > 0 else None
-def calculate_range_estimate(data):
-    fuel_level = calculate_fuel_level_estimate(data)
-    if not fuel_level or not data.get('vehicle'): return None
-    consumption_val = float(data['vehicle'].get('consumption', 0))
-    consumption_unit = data.get('units', {}).get('consumption', '')
-    if consumption_val <= 0: return None
-    if '100' in consumption_unit:
-        return round((fuel_level / consumption_val) * 100)
-    return round(fuel_level * consumption_val)
-def calculate_consumption_trend(refuelings):
-    if not refuelings or len(refuelings) < 3: return None
-    consumptions = [float(r['consumption']) for r in refuelings[:5] if r.get('consumption') and float(r.get('consumption')) > 0]
-    if len(consumptions) < 3: return None
-    recent_avg = sum(consumptions[:2]) / 2
-    older_avg = sum(consumptions[2:4]) / 2 if len(consumptions) >= 4 else consumptions[2]
-    if older_avg == 0: return "stable"
-    trend_ratio = recent_avg / older_avg
-    if trend_ratio < 0.95: return "improving"
-    elif trend_ratio > 1.05: return "worsening"
-    else: return "stable"
-def calculate_consumption_consistency(refuelings):
-    if not refuelings or len(refuelings) < 3: return None
-    consumptions = [float(r['consumption']) for r in refuelings[:5] if r.get('consumption') and float(r.get('consumption')) > 0]
-    if len(consumptions) < 3: return None
-    mean = sum(consumptions) / len(consumptions)
-    variance = sum((x - mean) ** 2 for x in consumptions) / len(consumptions)
-    return round(variance ** 0.5, 2)
-def calculate_avg_refuel_quantity(refuelings):
-    if not refuelings: return None
-    quantities = [float(r['quantity']) for r in refuelings[:5] if r.get('quantity') and float(r.get('quantity')) > 0]
-    if not quantities: return None
-    return round(sum(quantities) / len(quantities), 1)
-def calculate_avg_days_between_refuels(refuelings):
-    if not refuelings or len(refuelings) < 2: return None
-    dates = [datetime.strptime(r['date'], '%d.%m.%Y') for r in refuelings[:5] if r.get('date')]
-    if len(dates) < 2: return None
-    days_diffs = [(dates[i] - dates[i + 1]).days for i in range(len(dates) - 1) if (dates[i] - dates[i + 1]).days > 0]
-    if not days_diffs: return None
-    return round(sum(days_diffs) / len(days_diffs), 1)
-def calculate_price_variability(refuelings):
-    if not refuelings: return None
-    prices_per_unit = [float(r['cost']) / float(r['quantity']) for r in refuelings[:5] if r.get('cost') and r.get('quantity') and float(r.get('quantity')) > 0]
-    if len(prices_per_unit) < 2: return None
-    return round(max(prices_per_unit) - min(prices_per_unit), 2)
-def calculate_eco_driving_index(refuelings, vehicle_avg_consumption):
-    if not refuelings or not vehicle_avg_consumption or float(vehicle_avg_consumption) == 0: return None
-    recent_consumptions = [float(r['consumption']) for r in refuelings[:3] if r.get('consumption') and float(r.get('consumption')) > 0]
-    if not recent_consumptions: return None
-    recent_avg = sum(recent_consumptions) / len(recent_consumptions)
-    vehicle_avg = float(vehicle_avg_consumption)
-    performance_ratio = recent_avg / vehicle_avg
-    if performance_ratio < 0.9: performance_score = 10
-    elif performance_ratio < 1.0: performance_score = 8
-    elif performance_ratio < 1.1: performance_score = 6
-    else: performance_score = 4
-    consistency = calculate_consumption_consistency(refuelings) or 5
-    consistency_score = max(0, 10 - consistency * 5)
-    eco_index = (performance_score * 0.7 + consistency_score * 0.3)
-    return round(eco_index, 1)
-def calculate_cost_per_distance(refuelings):
-    if not refuelings or len(refuelings) < 2: return None
-    total_cost, total_trip = 0.0, 0.0
-    for r in refuelings[:10]:
-        cost = r.get('cost')
-        trip = r.get('trip')
-        if cost and trip and float(trip) > 0:
-            total_cost += float(cost)
-            total_trip += float(trip)
-    if total_trip == 0: return None
-    return round(total_cost / total_trip, 2)
-def calculate_full_battery_range(data):
-    if not data.get('vehicle'): return None
-    capacity = float(data['vehicle'].get('capacity', 0))
-    consumption_per_100km = float(data['vehicle'].get('consumption', 0))
-    if capacity <= 0 or consumption_per_100km <= 0: return None
-    return round((capacity * 100) / consumption_per_100km)
-def calculate_monthly_energy_charged(charges):
-    """Calculates total kWh charged in the current month."""
-    if not charges: return None
-    current_month_year = datetime.now().strftime('%m.%Y')
-    total_kwh_this_month = 0.0
-    for charge in charges:
-        try:
-            charge_date_str = charge.get('date')
-            quantity = charge.get('quantity')
-            if not charge_date_str or not quantity:
-                continue
-            charge_date = datetime.strptime(charge_date_str, '%d.%m.%Y')
-            if charge_date.strftime('%m.%Y') == current_month_year:
-                total_kwh_this_month += float(quantity)
-        except (ValueError, TypeError):
-            continue
-    return round(total_kwh_this_month, 2)
-
-def calculate_efficiency_per_distance(data):
-    """Converts kWh/100km (or mi) to km/kWh (or mi/kWh).
-
-    The vehicle's average consumption is stored as kWh/100km (or kWh/100mi).
-    This sensor inverts that to give efficiency as distance-per-kWh (e.g. mi/kWh),
-    which is the format shown on the Spritmonitor /tanks.json endpoint and is often
-    more intuitive for EV drivers familiar with MPGe-style figures.
+KWH = UnitOfEnergy.KILO_WATT_HOUR
+
+# Unit categories: (units from the Spritmonitor profile, currency) -> unit
+UNIT_RESOLVERS: dict[str, Callable[[dict, str | None], str | None]] = {
+    "trip": lambda units, currency: units.get("trip"),
+    "quantity": lambda units, currency: units.get("quantity"),
+    "consumption": lambda units, currency: units.get("consumption"),
+    "price_per_quantity": lambda units, currency: f"{currency}/{units.get('quantity')}",
+    "energy": lambda units, currency: KWH,
+    "energy_consumption": lambda units, currency: f"kWh/100{units.get('trip') or 'km'}",
+    "price_per_energy": lambda units, currency: f"{currency}/{KWH}",
+    # Distance-per-kWh efficiency (e.g. "mi/kWh" or "km/kWh") — inverse of avg_energy_consumption
+    "efficiency": lambda units, currency: f"{units.get('trip') or 'km'}/{KWH}",
+    "currency": lambda units, currency: currency,
+    "cost_per_distance": lambda units, currency: f"{currency}/{units.get('trip')}",
+    "days": lambda units, currency: "days",
+    "index": lambda units, currency: "/10",
+}
+
+
+@dataclass(frozen=True, kw_only=True)
+class SpritmonitorSensorEntityDescription(SensorEntityDescription):
+    """Static metadata of a Spritmonitor sensor.
+
+    unit_category picks a resolver from UNIT_RESOLVERS (units that depend on
+    the vehicle's profile); value_key is the key the value is read from and
+    defaults to the sensor key. Sensors with needs_history are unavailable
+    until the fueling history has been loaded.
     """
-    if not data.get('vehicle'): return None
-    consumption = float(data['vehicle'].get('consumption', 0))
-    if consumption <= 0: return None
-    return round(100 / consumption, 2)
+
+    unit_category: str | None = None
+    value_key: str | None = None
+    needs_history: bool = False
+
+
+def _desc(key, icon=None, unit=None, device_class=None, state_class=None, **kwargs):
+    kwargs.setdefault("translation_key", key)
+    return SpritmonitorSensorEntityDescription(
+        key=key, icon=icon, unit_category=unit,
+        device_class=device_class, state_class=state_class, **kwargs,
+    )
+
+
+DISTANCE = SensorDeviceClass.DISTANCE
+ENERGY = SensorDeviceClass.ENERGY
+MEASUREMENT = SensorStateClass.MEASUREMENT
+
+COMMON_SENSORS = (
+    _desc("brand_model"),
+    _desc("license_plate", "mdi:card-text"),
+    _desc("total_distance", "mdi:speedometer", "trip", DISTANCE, SensorStateClass.TOTAL),
+    _desc("last_refuel_date", "mdi:calendar", needs_history=True),
+    _desc("last_refuel_odometer", "mdi:speedometer", "trip", DISTANCE, SensorStateClass.TOTAL, needs_history=True),
+    _desc("last_refuel_trip", "mdi:map-marker-distance", "trip", DISTANCE, MEASUREMENT, needs_history=True),
+    _desc("last_refuel_cost", "mdi:currency-usd", "currency", SensorDeviceClass.MONETARY, needs_history=True),
+    _desc("last_refuel_type", "mdi:gas-station-outline", needs_history=True),
+    _desc("last_refuel_location", "mdi:map-marker", needs_history=True),
+    _desc("last_refuel_country", "mdi:flag", needs_history=True),
+    _desc("ranking_position", "mdi:trophy", state_class=MEASUREMENT),
+    _desc("ranking_total", "mdi:account-group"),
+    _desc("ranking_min_consumption", "mdi:trophy-award", "consumption", state_class=MEASUREMENT),
+    _desc("ranking_avg_consumption", "mdi:chart-bar", "consumption", state_class=MEASUREMENT),
+    _desc("next_service_km", "mdi:wrench", "trip"),
+    _desc("next_service_note", "mdi:note-text"),
+    _desc("next_service_date", "mdi:calendar-clock"),
+    _desc("km_to_next_service", "mdi:car-wrench", "trip", DISTANCE, MEASUREMENT, needs_history=True),
+)
+
+COMBUSTION_SENSORS = (
+    _desc("fuel_capacity", "mdi:gas-station", "quantity", SensorDeviceClass.VOLUME),
+    _desc("total_fuel", "mdi:gas-station", "quantity", SensorDeviceClass.VOLUME, SensorStateClass.TOTAL_INCREASING),
+    _desc("avg_consumption", "mdi:chart-line", "consumption", state_class=MEASUREMENT),
+    _desc("last_refuel_quantity", "mdi:gas-station", "quantity", state_class=MEASUREMENT, needs_history=True),
+    _desc("last_refuel_price_per_liter", "mdi:currency-usd", "price_per_quantity", state_class=MEASUREMENT, needs_history=True),
+    _desc("last_refuel_consumption", "mdi:car-speed-limiter", "consumption", state_class=MEASUREMENT, needs_history=True),
+    _desc("fuel_level_estimate", "mdi:gauge", "quantity", state_class=MEASUREMENT, needs_history=True),
+    _desc("range_estimate", "mdi:gas-station-off", "trip", DISTANCE, MEASUREMENT, needs_history=True),
+)
+
+ELECTRIC_SENSORS = (
+    _desc("battery_capacity", "mdi:battery", "energy", ENERGY),
+    _desc("total_energy_charged", "mdi:lightning-bolt", "energy", ENERGY, SensorStateClass.TOTAL_INCREASING),
+    _desc("avg_energy_consumption", "mdi:chart-line", "energy_consumption", state_class=MEASUREMENT),
+    _desc("last_charge_energy", "mdi:ev-station", "energy", ENERGY, needs_history=True),
+    _desc("last_charge_price_per_kwh", "mdi:currency-usd", "price_per_energy", state_class=MEASUREMENT, needs_history=True),
+    _desc("last_charge_consumption", "mdi:car-speed-limiter", "energy_consumption", state_class=MEASUREMENT, needs_history=True),
+    _desc("full_battery_range_estimate", "mdi:map-marker-radius", "trip", DISTANCE, MEASUREMENT),
+    _desc("monthly_energy_charged", "mdi:calendar-month", "energy", ENERGY, SensorStateClass.TOTAL, needs_history=True),
+    # Efficiency expressed as distance-per-kWh (e.g. mi/kWh or km/kWh),
+    # calculated as the inverse of avg_energy_consumption (kWh/100distance).
+    # Equivalent to the 'consumption' field on the Spritmonitor /tanks.json endpoint.
+    _desc("efficiency_per_distance", "mdi:lightning-bolt-circle", "efficiency", state_class=MEASUREMENT),
+)
+
+
+def _calculated_sensors(suffix: str = "") -> tuple:
+    """The history-derived sensors of one tank; PHEVs get a _fuel and an _electric set."""
+    quantity, consumption, price = {
+        "": ("quantity", "consumption", "price_per_quantity"),
+        "_fuel": ("quantity", "consumption", "price_per_quantity"),
+        "_electric": ("energy", "energy_consumption", "price_per_energy"),
+    }[suffix]
+    return (
+        _desc(f"consumption_trend{suffix}", "mdi:trending-up", needs_history=True),
+        _desc(f"consumption_consistency{suffix}", "mdi:chart-bell-curve", consumption, needs_history=True),
+        _desc(f"avg_refuel_quantity{suffix}", "mdi:gas-station-outline", quantity, needs_history=True),
+        _desc(f"avg_days_between_refuels{suffix}", "mdi:calendar-range", "days", needs_history=True),
+        _desc(f"price_variability{suffix}", "mdi:chart-line-variant", price, needs_history=True),
+        _desc(f"eco_driving_index{suffix}", "mdi:leaf", "index", needs_history=True),
+        _desc(f"cost_per_distance{suffix}", "mdi:cash-multiple", "cost_per_distance", needs_history=True),
+    )
+
+
+def _window_sensors(suffix: str = "") -> tuple:
+    """One sensor per window metric (windows.py) and configured window of one tank.
+
+    The window length is a translation placeholder, so each metric needs one
+    name for record windows and one for day windows.
+    """
+    consumption, price = {
+        "": ("consumption", "price_per_quantity"),
+        "_fuel": ("consumption", "price_per_quantity"),
+        "_electric": ("energy_consumption", "price_per_energy"),
+    }[suffix]
+    metrics = (
+        # metric, icon, unit category, device class, enabled by default
+        ("consumption", "mdi:chart-line", consumption, None, True),
+        ("consumption_stddev", "mdi:chart-bell-curve", consumption, None, False),
+        ("price_spread", "mdi:chart-line-variant", price, None, False),
+        ("cost_per_distance", "mdi:cash-multiple", "cost_per_distance", None, True),
+        ("cost", "mdi:cash", "currency", SensorDeviceClass.MONETARY, True),
+    )
+    windows = [("records", n, window_name(records=n)) for n in ROLLING_WINDOW_RECORDS]
+    windows += [("days", n, window_name(days=n)) for n in ROLLING_WINDOW_DAYS]
+    return tuple(
+        _desc(f"window_{metric}_{name}{suffix}", icon, unit, device_class,
+              None if device_class else MEASUREMENT,
+              translation_key=f"window_{metric}_{kind}{suffix}", translation_placeholders={"count": str(n)},
+              entity_registry_enabled_default=enabled, needs_history=True)
+        for metric, icon, unit, device_class, enabled in metrics
+        for kind, n, name in windows
+    )
+
+
+def _period_sensors(suffix: str = "") -> tuple:
+    """Month-to-date, previous-month and year-to-date totals of one tank (periods.py)."""
+    quantity, quantity_class = ("energy", ENERGY) if suffix == "_electric" else ("quantity", None)
+    metrics = (
+        # metric, icon, unit category, device class, enabled by default
+        ("quantity", "mdi:gas-station-outline", quantity, quantity_class, True),
+        ("cost", "mdi:cash", "currency", SensorDeviceClass.MONETARY, True),
+        ("distance", "mdi:map-marker-distance", "trip", DISTANCE, True),
+        ("fuelings", "mdi:counter", None, None, False),
+    )
+    return tuple(
+        _desc(f"period_{metric}_{period}{suffix}", icon, unit, device_class, SensorStateClass.TOTAL,
+              entity_registry_enabled_default=enabled, needs_history=True)
+        for metric, icon, unit, device_class, enabled in metrics
+        for period in PERIODS
+    )
+
+
+QUEUE_SENSORS = (
+    _desc("pending_fuelings", "mdi:tray-full", state_class=MEASUREMENT,
+          entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False),
+    _desc("oldest_pending_fueling_age", "mdi:timer-sand", device_class=SensorDeviceClass.DURATION,
+          native_unit_of_measurement=UnitOfTime.SECONDS,
+          entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False),
+)
+
+# value_key is the name of the metric in coordinator.metrics
+METRIC_SENSORS = tuple(
+    _desc(key, icon, device_class=device_class, state_class=MEASUREMENT, value_key=metric,
+          native_unit_of_measurement=unit,
+          entity_category=EntityCategory.DIAGNOSTIC, entity_registry_enabled_default=False)
+    for key, icon, metric, device_class, unit in (
+        ("update_duration", "mdi:timer-outline", "total_ms", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS),
+        ("fuelings_request_duration", "mdi:cloud-download-outline", "fuelings_request_ms", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS),
+        ("analytics_duration", "mdi:calculator-variant-outline", "analytics_ms", SensorDeviceClass.DURATION, UnitOfTime.MILLISECONDS),
+        ("fuelings_response_size", "mdi:file-download-outline", "fuelings_bytes", SensorDeviceClass.DATA_SIZE, UnitOfInformation.BYTES),
+        ("fuelings_fetched", "mdi:format-list-numbered", "fuelings_records", None, None),
+    )
+)
+
+
+# value_key is the name of the figure in FleetAggregator.data
+FLEET_SENSORS = (
+    _desc("fleet_vehicles", "mdi:car-multiple", state_class=MEASUREMENT, value_key="vehicles"),
+    _desc("fleet_monthly_cost", "mdi:cash", device_class=SensorDeviceClass.MONETARY,
+          state_class=SensorStateClass.TOTAL, value_key="monthly_cost"),
+    _desc("fleet_total_distance", "mdi:speedometer", device_class=DISTANCE, state_class=SensorStateClass.TOTAL,
+          native_unit_of_measurement=UnitOfLength.KILOMETERS, value_key="total_distance"),
+    _desc("fleet_avg_consumption_fuel", "mdi:chart-line", state_class=MEASUREMENT, value_key="avg_consumption_fuel"),
+    _desc("fleet_avg_consumption_electric", "mdi:chart-line", state_class=MEASUREMENT,
+          value_key="avg_consumption_electric"),
+    _desc("fleet_service_overdue", "mdi:car-wrench", state_class=MEASUREMENT, value_key="service_overdue"),
+)
 
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
+    if config_entry.data.get(CONF_FLEET):
+        fleet = hass.data[DOMAIN][DATA_FLEET]
+        async_add_entities(SpritmonitorFleetSensor(fleet, description) for description in FLEET_SENSORS)
+        return
+
     coordinator = hass.data[DOMAIN][config_entry.entry_id]
     vehicle_type = config_entry.data.get(CONF_VEHICLE_TYPE)
-    
-    all_sensors = []
-    
-    # Common sensors
-    all_sensors.extend([
-        SpritmonitorSensor(coordinator, "brand_model", lambda d: f"{d['vehicle'].get('make', '')} {d['vehicle'].get('model', '')}"),
-        SpritmonitorSensor(coordinator, "license_plate", lambda d: d['vehicle'].get('sign')),
-        SpritmonitorSensor(coordinator, "total_distance", lambda d: float(d['vehicle'].get('tripsum', 0)), device_class=SensorDeviceClass.DISTANCE, state_class=SensorStateClass.TOTAL),
-        SpritmonitorSensor(coordinator, "last_refuel_date", lambda d: d.get('last_refueling', {}).get('date')),
-        SpritmonitorSensor(coordinator, "last_refuel_odometer", lambda d: float(d.get('last_refueling', {}).get('odometer', 0)), device_class=SensorDeviceClass.DISTANCE, state_class=SensorStateClass.TOTAL),
-        SpritmonitorSensor(coordinator, "last_refuel_trip", lambda d: float(d.get('last_refueling', {}).get('trip', 0)), device_class=SensorDeviceClass.DISTANCE, state_class=SensorStateClass.MEASUREMENT),
-        SpritmonitorSensor(coordinator, "last_refuel_cost", lambda d: format_cost(d.get('last_refueling', {}).get('cost', 0)), device_class=SensorDeviceClass.MONETARY, state_class=None),
-        SpritmonitorSensor(coordinator, "last_refuel_type", lambda d: d.get('last_refueling', {}).get('type')),
-        SpritmonitorSensor(coordinator, "last_refuel_location", lambda d: d.get('last_refueling', {}).get('location')),
-        SpritmonitorSensor(coordinator, "last_refuel_country", lambda d: d.get('last_refueling', {}).get('country')),
-        SpritmonitorSensor(coordinator, "ranking_position", lambda d: d['vehicle']['rankingInfo'].get('rank'), state_class=SensorStateClass.MEASUREMENT),
-        SpritmonitorSensor(coordinator, "ranking_total", lambda d: d['vehicle']['rankingInfo'].get('total')),
-        SpritmonitorSensor(coordinator, "ranking_min_consumption", lambda d: float(d['vehicle']['rankingInfo'].get('min', 0)), state_class=SensorStateClass.MEASUREMENT),
-        SpritmonitorSensor(coordinator, "ranking_avg_consumption", lambda d: float(d['vehicle']['rankingInfo'].get('avg', 0)), state_class=SensorStateClass.MEASUREMENT),
-        SpritmonitorSensor(coordinator, "next_service_km", lambda d: (r.get('next_odometer') if (r := get_next_service_reminder(d.get('reminders', []))) else None)),
-        SpritmonitorSensor(coordinator, "next_service_note", lambda d: (r.get('note') if (r := get_next_service_reminder(d.get('reminders', []))) else None)),
-        SpritmonitorSensor(coordinator, "next_service_date", lambda d: get_next_service_date_reminder(d.get('reminders', []))),
-        SpritmonitorSensor(coordinator, "km_to_next_service", lambda d: calculate_km_to_service(d), device_class=SensorDeviceClass.DISTANCE, state_class=SensorStateClass.MEASUREMENT),
-    ])
-
-    is_combustion = vehicle_type in [VEHICLE_TYPE_COMBUSTION, VEHICLE_TYPE_PHEV]
-    is_electric = vehicle_type in [VEHICLE_TYPE_ELECTRIC, VEHICLE_TYPE_PHEV]
-
-    if is_combustion:
-        combustion_sensors = [
-            SpritmonitorSensor(coordinator, "fuel_capacity", lambda d: float(d['vehicle'].get('capacity', 0)), device_class=SensorDeviceClass.VOLUME),
-            SpritmonitorSensor(coordinator, "total_fuel", lambda d: float(d['vehicle'].get('quantitysum', 0)), device_class=SensorDeviceClass.VOLUME, state_class=SensorStateClass.TOTAL_INCREASING),
-            SpritmonitorSensor(coordinator, "avg_consumption", lambda d: float(d['vehicle'].get('consumption', 0)), state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "last_refuel_quantity", lambda d: float(d.get('last_gas_refueling', {}).get('quantity', 0)), state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "last_refuel_price_per_liter", lambda d: calculate_price_per_unit(d.get('last_gas_refueling', {}).get('cost'), d.get('last_gas_refueling', {}).get('quantity')), state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "last_refuel_consumption", lambda d: float(d.get('last_gas_refueling', {}).get('consumption', 0)), state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "fuel_level_estimate", lambda d: calculate_fuel_level_estimate(d), state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "range_estimate", lambda d: calculate_range_estimate(d), device_class=SensorDeviceClass.DISTANCE, state_class=SensorStateClass.MEASUREMENT),
-        ]
-        all_sensors.extend(combustion_sensors)
-
-    if is_electric:
-        electric_sensors = [
-            SpritmonitorSensor(coordinator, "battery_capacity", lambda d: float(d['vehicle'].get('capacity', 0)), device_class=SensorDeviceClass.ENERGY, state_class=None),
-            SpritmonitorSensor(coordinator, "total_energy_charged", lambda d: float(d['vehicle'].get('quantitysum', 0)), device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL_INCREASING),
-            SpritmonitorSensor(coordinator, "avg_energy_consumption", lambda d: float(d['vehicle'].get('consumption', 0)), state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "last_charge_energy", lambda d: float(d.get('last_electric_charge', {}).get('quantity', 0)), device_class=SensorDeviceClass.ENERGY, state_class=None),
-            SpritmonitorSensor(coordinator, "last_charge_price_per_kwh", lambda d: calculate_price_per_unit(d.get('last_electric_charge', {}).get('cost'), d.get('last_electric_charge', {}).get('quantity')), state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "last_charge_consumption", lambda d: float(d.get('last_electric_charge', {}).get('consumption', 0)), state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "full_battery_range_estimate", lambda d: calculate_full_battery_range(d), device_class=SensorDeviceClass.DISTANCE, state_class=SensorStateClass.MEASUREMENT),
-            SpritmonitorSensor(coordinator, "monthly_energy_charged", lambda d: calculate_monthly_energy_charged(d.get('electric_charges', [])), device_class=SensorDeviceClass.ENERGY, state_class=SensorStateClass.TOTAL),
-            # Efficiency expressed as distance-per-kWh (e.g. mi/kWh or km/kWh),
-            # calculated as the inverse of avg_energy_consumption (kWh/100distance).
-            # Equivalent to the 'consumption' field on the Spritmonitor /tanks.json endpoint.
-            SpritmonitorSensor(coordinator, "efficiency_per_distance", lambda d: calculate_efficiency_per_distance(d), state_class=SensorStateClass.MEASUREMENT),
-        ]
-        all_sensors.extend(electric_sensors)
-    
+
+    descriptions = list(COMMON_SENSORS)
+    if vehicle_type in [VEHICLE_TYPE_COMBUSTION, VEHICLE_TYPE_PHEV]:
+        descriptions.extend(COMBUSTION_SENSORS)
+    if vehicle_type in [VEHICLE_TYPE_ELECTRIC, VEHICLE_TYPE_PHEV]:
+        descriptions.extend(ELECTRIC_SENSORS)
     if vehicle_type == VEHICLE_TYPE_PHEV:
-        phev_calculated_sensors = [
-            SpritmonitorSensor(coordinator, "consumption_trend_fuel", lambda d: calculate_consumption_trend(d.get('gas_refuelings', []))),
-            SpritmonitorSensor(coordinator, "consumption_consistency_fuel", lambda d: calculate_consumption_consistency(d.get('gas_refuelings', []))),
-            SpritmonitorSensor(coordinator, "avg_refuel_quantity_fuel", lambda d: calculate_avg_refuel_quantity(d.get('gas_refuelings', []))),
-            SpritmonitorSensor(coordinator, "avg_days_between_refuels_fuel", lambda d: calculate_avg_days_between_refuels(d.get('gas_refuelings', []))),
-            SpritmonitorSensor(coordinator, "price_variability_fuel", lambda d: calculate_price_variability(d.get('gas_refuelings', []))),
-            SpritmonitorSensor(coordinator, "eco_driving_index_fuel", lambda d: calculate_eco_driving_index(d.get('gas_refuelings', []), d.get('vehicle', {}).get('consumption'))),
-            SpritmonitorSensor(coordinator, "cost_per_distance_fuel", lambda d: calculate_cost_per_distance(d.get('gas_refuelings', []))),
-            SpritmonitorSensor(coordinator, "consumption_trend_electric", lambda d: calculate_consumption_trend(d.get('electric_charges', []))),
-            SpritmonitorSensor(coordinator, "consumption_consistency_electric", lambda d: calculate_consumption_consistency(d.get('electric_charges', []))),
-            SpritmonitorSensor(coordinator, "avg_refuel_quantity_electric", lambda d: calculate_avg_refuel_quantity(d.get('electric_charges', []))),
-            SpritmonitorSensor(coordinator, "avg_days_between_refuels_electric", lambda d: calculate_avg_days_between_refuels(d.get('electric_charges', []))),
-            SpritmonitorSensor(coordinator, "price_variability_electric", lambda d: calculate_price_variability(d.get('electric_charges', []))),
-            SpritmonitorSensor(coordinator, "eco_driving_index_electric", lambda d: calculate_eco_driving_index(d.get('electric_charges', []), d.get('vehicle', {}).get('consumption'))),
-            SpritmonitorSensor(coordinator, "cost_per_distance_electric", lambda d: calculate_cost_per_distance(d.get('electric_charges', []))),
-        ]
-        all_sensors.extend(phev_calculated_sensors)
+        descriptions.extend(_calculated_sensors("_fuel") + _calculated_sensors("_electric"))
+        descriptions.extend(_window_sensors("_fuel") + _window_sensors("_electric"))
+        descriptions.extend(_period_sensors("_fuel") + _period_sensors("_electric"))
     else:
-        calculated_sensors = [
-            SpritmonitorSensor(coordinator, "consumption_trend", lambda d: calculate_consumption_trend(d.get('refuelings', []))),
-            SpritmonitorSensor(coordinator, "consumption_consistency", lambda d: calculate_consumption_consistency(d.get('refuelings', []))),
-            SpritmonitorSensor(coordinator, "avg_refuel_quantity", lambda d: calculate_avg_refuel_quantity(d.get('refuelings', []))),
-            SpritmonitorSensor(coordinator, "avg_days_between_refuels", lambda d: calculate_avg_days_between_refuels(d.get('refuelings', []))),
-            SpritmonitorSensor(coordinator, "price_variability", lambda d: calculate_price_variability(d.get('refuelings', []))),
-            SpritmonitorSensor(coordinator, "eco_driving_index", lambda d: calculate_eco_driving_index(d.get('refuelings', []), d.get('vehicle', {}).get('consumption'))),
-            SpritmonitorSensor(coordinator, "cost_per_distance", lambda d: calculate_cost_per_distance(d.get('refuelings', []))),
-        ]
-        all_sensors.extend(calculated_sensors)
-    
+        descriptions.extend(_calculated_sensors())
+        descriptions.extend(_window_sensors())
+        descriptions.extend(_period_sensors())
+
+    all_sensors = [SpritmonitorSensor(coordinator, description) for description in descriptions]
+    all_sensors.extend(SpritmonitorQueueSensor(coordinator, description) for description in QUEUE_SENSORS)
+    all_sensors.extend(SpritmonitorMetricSensor(coordinator, description) for description in METRIC_SENSORS)
     async_add_entities(all_sensors)
 
 class SpritmonitorSensor(CoordinatorEntity, SensorEntity):
     _attr_has_entity_name = True
+    entity_description: SpritmonitorSensorEntityDescription
 
-    def __init__(self, coordinator, sensor_id, value_fn, **kwargs):
+    def __init__(self, coordinator, description: SpritmonitorSensorEntityDescription):
         super().__init__(coordinator)
-        self.sensor_id = sensor_id
-        self._value_fn = value_fn
+        self.entity_description = description
+        self.sensor_id = description.key
+        self._value_key = description.value_key or description.key
         self._vehicle_id = self.coordinator.config_entry.data.get(CONF_VEHICLE_ID)
-        self._attr_device_class = kwargs.get("device_class")
-        self._attr_state_class = kwargs.get("state_class")
+        self._currency = self.coordinator.config_entry.data.get(CONF_CURRENCY)
         self._attr_unique_id = f"spritmonitor_{self._vehicle_id}_{self.sensor_id}"
-        self._attr_translation_key = self.sensor_id
+        self._last_written = None
+        self._units_seen = None
+        self._unit = None
         if self.sensor_id == "brand_model":
             self._attr_entity_picture = f"https://www.spritmonitor.de/pics/vehicle/{self._vehicle_id}.jpg"
-        else:
-            self._attr_icon = self.get_icon()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state only when something this sensor shows has changed."""
+        state = (self.available, self.native_value, self.native_unit_of_measurement, self.extra_state_attributes)
+        if state == self._last_written:
+            return
+        self._last_written = state
+        self.async_write_ha_state()
 
     @property
     def native_unit_of_measurement(self) -> str | None:
-        """Return the unit of the sensor, determined dynamically and specifically for each type."""
-        if not self.coordinator.data or not self.coordinator.data.get("units"): return None
-        
-        units = self.coordinator.data.get("units", {})
-        currency = self.coordinator.config_entry.data.get(CONF_CURRENCY)
-        trip_unit = units.get("trip")
-        
-        # Combustion sensors
-        if self.sensor_id in ["fuel_capacity", "total_fuel", "last_refuel_quantity", "fuel_level_estimate", "avg_refuel_quantity_fuel", "avg_refuel_quantity"]:
-            return units.get("quantity")
-        if self.sensor_id in ["avg_consumption", "last_refuel_consumption", "consumption_consistency_fuel", "consumption_consistency"]:
-            return units.get("consumption")
-        if self.sensor_id in ["last_refuel_price_per_liter", "price_variability_fuel", "price_variability"]:
-             return f"{currency}/{units.get('quantity')}"
-
-        # Electric sensors
-        if self.sensor_id in ["battery_capacity", "total_energy_charged", "last_charge_energy", "avg_refuel_quantity_electric", "monthly_energy_charged"]:
-            return UnitOfEnergy.KILO_WATT_HOUR
-        if self.sensor_id in ["avg_energy_consumption", "last_charge_consumption", "consumption_consistency_electric"]:
-            return f"kWh/100{trip_unit}" if trip_unit else "kWh/100km"
-        if self.sensor_id in ["last_charge_price_per_kwh", "price_variability_electric"]:
-            return f"{currency}/{UnitOfEnergy.KILO_WATT_HOUR}"
-        # Distance-per-kWh efficiency (e.g. "mi/kWh" or "km/kWh") — inverse of avg_energy_consumption
-        if self.sensor_id == "efficiency_per_distance":
-            return f"{trip_unit}/{UnitOfEnergy.KILO_WATT_HOUR}" if trip_unit else f"km/{UnitOfEnergy.KILO_WATT_HOUR}"
-
-        # Common and calculated sensors
-        if self.sensor_id in ["total_distance", "last_refuel_odometer", "last_refuel_trip", "km_to_next_service", "next_service_km", "range_estimate", "full_battery_range_estimate"]:
-            return trip_unit
-        if self.sensor_id == "last_refuel_cost":
-            return currency
-        if "cost_per_distance" in self.sensor_id:
-            return f"{currency}/{trip_unit}"
-
-        if "days" in self.sensor_id: return "days"
-        if "eco_driving_index" in self.sensor_id: return "/10"
-        
-        if self.sensor_id in ["ranking_min_consumption", "ranking_avg_consumption"]:
-            return units.get("consumption")
-
-        return None
+        """Unit from the description, resolved again only when the vehicle's units change."""
+        category = self.entity_description.unit_category
+        if category is None:
+            return self.entity_description.native_unit_of_measurement
+        units = self.coordinator.data.get("units") if self.coordinator.data else None
+        if units != self._units_seen:
+            self._units_seen = units
+            self._unit = UNIT_RESOLVERS[category](units, self._currency) if units else None
+        return self._unit
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -332,36 +315,129 @@ class SpritmonitorSensor(CoordinatorEntity, SensorEntity):
 
     @property
     def native_value(self):
-        try:
-            if self.coordinator.data:
-                return self._value_fn(self.coordinator.data)
-            return None
-        except (KeyError, TypeError, AttributeError, ValueError, IndexError):
-            return None
+        # Values are computed once per update by analytics.compute_analytics
+        if self.coordinator.data:
+            return self.coordinator.data.get("analytics", {}).get(self._value_key)
+        return None
+
+    @property
+    def available(self) -> bool:
+        data = self.coordinator.data
+        if not self.coordinator.last_update_success or data is None:
+            return False
+        return not self.entity_description.needs_history or data["meta"].get("history_ready", True)
+
+
+class SpritmonitorQueueSensor(SpritmonitorSensor):
+    """Depth and oldest-item age of this vehicle's share of the offline write queue."""
+
+    def __init__(self, coordinator, description):
+        super().__init__(coordinator, description)
+        self._queue = coordinator.hass.data[DOMAIN][DATA_QUEUE]
+        self._unsub_tick = None
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(self.hass, SIGNAL_QUEUE_UPDATED, self._handle_queue_update)
+        )
+        self.async_on_remove(self._stop_ticking)
+        self._handle_queue_update()
+
+    @callback
+    def _handle_queue_update(self) -> None:
+        """Write the new state; the age also grows between queue changes, so it ticks while items wait."""
+        self._handle_coordinator_update()
+        if self.sensor_id != "oldest_pending_fueling_age":
+            return
+        if not self._queue.depth(self.coordinator.config_entry.entry_id):
+            self._stop_ticking()
+        elif self._unsub_tick is None:
+            self._unsub_tick = async_track_time_interval(self.hass, self._tick, QUEUE_AGE_UPDATE_INTERVAL)
+
+    @callback
+    def _tick(self, _now) -> None:
+        self._handle_coordinator_update()
+
+    @callback
+    def _stop_ticking(self) -> None:
+        if self._unsub_tick:
+            self._unsub_tick()
+            self._unsub_tick = None
+
+    @property
+    def native_value(self):
+        entry_id = self.coordinator.config_entry.entry_id
+        if self.sensor_id == "pending_fuelings":
+            return self._queue.depth(entry_id)
+        age = self._queue.oldest_age(entry_id)
+        return round(age) if age is not None else None
+
+    @property
+    def available(self) -> bool:
+        return True
+
+
+class SpritmonitorMetricSensor(SpritmonitorSensor):
+    """Figures of the last update from coordinator.metrics, with rolling percentiles as attributes."""
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # Unchanged payloads do not notify coordinator listeners, but every update has metrics.
+        signal = SIGNAL_METRICS_UPDATED.format(self.coordinator.config_entry.entry_id)
+        self.async_on_remove(async_dispatcher_connect(self.hass, signal, self._handle_coordinator_update))
+
+    @property
+    def native_value(self):
+        return self.coordinator.metrics.last.get(self._value_key)
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        return self.coordinator.metrics.percentiles(self._value_key)
+
+    @property
+    def available(self) -> bool:
+        return bool(self.coordinator.metrics.last)
+
+
+class SpritmonitorFleetSensor(SensorEntity):
+    """A figure of FleetAggregator.data, on the fleet device; units come with the data."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    entity_description: SpritmonitorSensorEntityDescription
+
+    def __init__(self, fleet, description: SpritmonitorSensorEntityDescription):
+        self.entity_description = description
+        self._fleet = fleet
+        self._attr_unique_id = f"{FLEET_UNIQUE_ID}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, FLEET_UNIQUE_ID)}, name="Spritmonitor Fleet",
+            manufacturer=MANUFACTURER, entry_type=DeviceEntryType.SERVICE,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(async_dispatcher_connect(self.hass, SIGNAL_FLEET_UPDATED, self._handle_fleet_update))
+
+    @callback
+    def _handle_fleet_update(self) -> None:
+        self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        return self._fleet.data.get(self.entity_description.value_key)
+
+    @property
+    def native_unit_of_measurement(self) -> str | None:
+        return self.entity_description.native_unit_of_measurement or self._fleet.data.get("units", {}).get(
+            self.entity_description.value_key
+        )
+
+    @property
+    def extra_state_attributes(self) -> dict | None:
+        return self._fleet.data.get("attributes", {}).get(self.entity_description.value_key)
 
     @property
     def available(self) -> bool:
-        return self.coordinator.last_update_success and self.coordinator.data is not None
-
-    def get_icon(self):
-        base_sensor_id = self.sensor_id.replace('_fuel', '').replace('_electric', '')
-        icons = {
-            "license_plate": "mdi:card-text", "total_distance": "mdi:speedometer", "last_refuel_date": "mdi:calendar", 
-            "last_refuel_odometer": "mdi:speedometer", "last_refuel_trip": "mdi:map-marker-distance",
-            "last_refuel_cost": "mdi:currency-usd", "last_refuel_type": "mdi:gas-station-outline",
-            "last_refuel_location": "mdi:map-marker", "last_refuel_country": "mdi:flag", "ranking_position": "mdi:trophy",
-            "ranking_total": "mdi:account-group", "ranking_min_consumption": "mdi:trophy-award", "ranking_avg_consumption": "mdi:chart-bar",
-            "next_service_km": "mdi:wrench", "next_service_note": "mdi:note-text", "next_service_date": "mdi:calendar-clock",
-            "km_to_next_service": "mdi:car-wrench", "fuel_capacity": "mdi:gas-station", "total_fuel": "mdi:gas-station",
-            "avg_consumption": "mdi:chart-line", "last_refuel_price_per_liter": "mdi:currency-usd", "last_refuel_consumption": "mdi:car-speed-limiter",
-            "last_refuel_quantity": "mdi:gas-station", "fuel_level_estimate": "mdi:gauge", "range_estimate": "mdi:gas-station-off",
-            "battery_capacity": "mdi:battery", "total_energy_charged": "mdi:lightning-bolt", "avg_energy_consumption": "mdi:chart-line", 
-            "last_charge_energy": "mdi:ev-station", "last_charge_price_per_kwh": "mdi:currency-usd",
-            "last_charge_consumption": "mdi:car-speed-limiter", "full_battery_range_estimate": "mdi:map-marker-radius", 
-            "consumption_trend": "mdi:trending-up", "consumption_consistency": "mdi:chart-bell-curve", "avg_refuel_quantity": "mdi:gas-station-outline", 
-            "avg_days_between_refuels": "mdi:calendar-range", "price_variability": "mdi:chart-line-variant", 
-            "eco_driving_index": "mdi:leaf", "cost_per_distance": "mdi:cash-multiple",
-            "monthly_energy_charged": "mdi:calendar-month",
-            "efficiency_per_distance": "mdi:lightning-bolt-circle",
-        }
-        return icons.get(base_sensor_id)
+        return bool(self._fleet.data.get("vehicles"))
@@ -1,55 +1,116 @@
 """Define services for the Spritmonitor integration."""
 
+import asyncio
+import csv
+import json
+from functools import partial
 from datetime import datetime as dt
 import logging
 import aiohttp
+import voluptuous as vol
 
-from homeassistant.core import HomeAssistant, ServiceCall
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant, ServiceCall, callback, ServiceResponse, SupportsResponse
 from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.device_registry import async_get as async_get_device_registry
+from homeassistant.helpers.update_coordinator import UpdateFailed
 
 from .const import (
     DOMAIN,
     SERVICE_ADD_FUELING_SCHEMA,
     SERVICE_ADD_FUELING,
+    SERVICE_ADD_FUELINGS_BATCH,
+    SERVICE_ADD_FUELINGS_BATCH_SCHEMA,
+    BATCH_MAX_PARALLEL,
+    SERVICE_EXPORT_HISTORY,
+    SERVICE_EXPORT_HISTORY_SCHEMA,
+    EXPORT_SOURCE_API,
     CONF_VEHICLE_ID,
     CONF_APP_TOKEN,
     CONF_BEARER_TOKEN,
     API_BASE_URL,
+    DATA_QUEUE,
+    DATA_INDEX,
 )
 
+from .api import RETRY_STATUSES, async_get_client
+from .export import async_api_pages, async_cached_pages, async_export, parquet_available
+from .write_queue import FuelingWriteQueue, SubmitRetryableError
+
 _LOGGER = logging.getLogger(__name__)
 
 
-def async_setup_services(hass: HomeAssistant) -> None:
+async def async_setup_services(hass: HomeAssistant) -> None:
     """Register all Spritmonitor services."""
+    queue = FuelingWriteQueue(hass, partial(_submit_fueling, hass))
+    await queue.async_load()
+    hass.data.setdefault(DOMAIN, {})[DATA_QUEUE] = queue
+
+    @callback
+    def stop_queue(_event) -> None:
+        queue.async_stop()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, stop_queue)
 
-    async def handle_add_fueling(call: ServiceCall) -> None:
+    async def handle_add_fueling(call: ServiceCall) -> ServiceResponse:
         """Handle the add fueling service call."""
-        await _async_add_fueling(hass, call)
+        return await _async_add_fueling(hass, call)
+
+    async def handle_add_fuelings_batch(call: ServiceCall) -> ServiceResponse:
+        """Handle the batch import service call."""
+        return await _async_add_fuelings_batch(hass, call)
+
+    async def handle_export_history(call: ServiceCall) -> ServiceResponse:
+        """Handle the history export service call."""
+        return await _async_export_history(hass, call)
 
     hass.services.async_register(
         DOMAIN,
         SERVICE_ADD_FUELING,
         handle_add_fueling,
         schema=SERVICE_ADD_FUELING_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ADD_FUELINGS_BATCH,
+        handle_add_fuelings_batch,
+        schema=SERVICE_ADD_FUELINGS_BATCH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_HISTORY,
+        handle_export_history,
+        schema=SERVICE_EXPORT_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
     )
     _LOGGER.info("Spritmonitor services registered.")
 
 
-async def _async_add_fueling(hass: HomeAssistant, call: ServiceCall) -> None:
-    """Add a fueling entry to Spritmonitor."""
+async def _async_add_fueling(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Add a fueling entry to Spritmonitor; the response tells whether it was queued instead."""
     data = dict(call.data)  # Make mutable copy
     _LOGGER.debug("Service call data: %s", data)
 
+    entry, vehicle_id, tank_id, params = _prepare_fueling(hass, data)
+    _LOGGER.info("Adding fueling for vehicle_id=%s", vehicle_id)
+
+    # Submit fueling
+    queued = await _async_submit_or_queue(hass, entry, vehicle_id, tank_id, params)
+    if queued is None:
+        await _async_refresh_after_write(hass, entry)
+    return {"vehicle_id": vehicle_id, "submitted": queued is None, "queued": queued}
+
+
+def _prepare_fueling(hass: HomeAssistant, data: dict) -> tuple:
+    """Turn validated service data into (entry, vehicle_id, tank_id, API params)."""
     # Handle position
     _validate_position(data)
 
     # Resolve device and config
     entry = _resolve_config_entry(hass, data["vehicle_device"])
     vehicle_id = entry.data[CONF_VEHICLE_ID]
-    _LOGGER.info("Adding fueling for vehicle_id=%s", vehicle_id)
 
     # Parse date
     data["date"] = _parse_date(data.get("date"))
@@ -59,9 +120,117 @@ async def _async_add_fueling(hass: HomeAssistant, call: ServiceCall) -> None:
     params.update(_prepare_optional_params(data))
     _combine_attributes(data, params)
     _combine_charge_info(data, params)
+    return entry, vehicle_id, data["tank_id"], params
+
+
+async def _async_add_fuelings_batch(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Validate every row first, then submit them with bounded parallelism."""
+    rows = call.data.get("fuelings")
+    if rows is None:
+        rows = await hass.async_add_executor_job(_load_batch_file, hass, call.data["file_path"])
+    default_device = call.data.get("vehicle_device")
+
+    prepared, errors = [], []
+    for index, row in enumerate(rows):
+        row = {k: v for k, v in row.items() if v not in ("", None)}
+        if default_device:
+            row.setdefault("vehicle_device", default_device)
+        try:
+            prepared.append(_prepare_fueling(hass, SERVICE_ADD_FUELING_SCHEMA(row)))
+        except (vol.Invalid, HomeAssistantError) as err:
+            errors.append(f"row {index}: {err}")
+    if errors:
+        raise HomeAssistantError(f"Invalid fuelings, nothing was submitted: {'; '.join(errors)}")
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_PARALLEL)
+
+    async def submit(index: int, entry, vehicle_id, tank_id, params) -> dict:
+        async with semaphore:
+            try:
+                queued = await _async_submit_or_queue(hass, entry, vehicle_id, tank_id, params)
+            except HomeAssistantError as err:
+                return {"row": index, "vehicle_id": vehicle_id, "success": False, "error": str(err)}
+        if queued:
+            return {"row": index, "vehicle_id": vehicle_id, "success": False, "queued": queued}
+        return {"row": index, "vehicle_id": vehicle_id, "success": True}
+
+    _LOGGER.info("Submitting %d fuelings in batch", len(prepared))
+    results = await asyncio.gather(*(submit(i, *p) for i, p in enumerate(prepared)))
+
+    # One refresh per affected vehicle, once everything has been posted.
+    entries = {p[0].entry_id: p[0] for p, r in zip(prepared, results) if r["success"]}
+    for entry in entries.values():
+        await _async_refresh_after_write(hass, entry)
+
+    succeeded = sum(r["success"] for r in results)
+    queued = sum("queued" in r for r in results)
+    _LOGGER.info(
+        "Batch import finished: %d of %d fuelings added, %d queued for retry",
+        succeeded, len(results), queued,
+    )
+    return {"submitted": len(results), "succeeded": succeeded, "queued": queued, "results": results}
 
-    # Submit fueling
-    await _submit_fueling(hass, entry, vehicle_id, data["tank_id"], params)
+
+def _load_batch_file(hass: HomeAssistant, path: str) -> list[dict]:
+    """Read fuelings from a .csv (header row) or .json (list of objects) file."""
+    if not hass.config.is_allowed_path(path):
+        raise HomeAssistantError(f"Access to {path} is not allowed")
+    try:
+        with open(path, encoding="utf-8", newline="") as file:
+            if path.lower().endswith(".csv"):
+                return list(csv.DictReader(file))
+            rows = json.load(file)
+    except (OSError, ValueError) as err:
+        raise HomeAssistantError(f"Cannot read {path}: {err}") from err
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise HomeAssistantError(f"{path} must contain a list of fueling objects")
+    return rows
+
+
+async def _async_export_history(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Stream the vehicle's history, filtered by date and tank, to a file."""
+    data = call.data
+    start, end = data.get("start_date"), data.get("end_date")
+    if start and end and start > end:
+        raise HomeAssistantError("start_date must not be after end_date")
+    export_format = data["format"]
+    if export_format == "parquet" and not parquet_available():
+        raise HomeAssistantError("Parquet export needs the pyarrow package, which is not installed")
+
+    vehicle = hass.data[DOMAIN][DATA_INDEX].by_device(data["vehicle_device"])
+    if vehicle is None:
+        raise HomeAssistantError(f"Device {data['vehicle_device']} is not a loaded Spritmonitor vehicle")
+    coordinator = vehicle.coordinator
+
+    path = hass.config.path(
+        data.get("file_path")
+        or f"spritmonitor_{vehicle.vehicle_id}_{dt.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    )
+    if not hass.config.is_allowed_path(path):
+        raise HomeAssistantError(f"Access to {path} is not allowed")
+
+    if data["source"] == EXPORT_SOURCE_API:
+        # Downloads it again: a response reused from a recent sync would not be a fresh copy.
+        pages = async_api_pages(partial(coordinator.async_fetch_fuelings_page, max_age=0))
+    else:
+        await coordinator.history.async_load()
+        if not coordinator.history.ready:
+            raise HomeAssistantError(
+                f"The history of vehicle {vehicle.vehicle_id} has not been synced yet; export from the API instead"
+            )
+        pages = async_cached_pages(coordinator.history.rows)
+
+    try:
+        result = await async_export(hass, pages, path, export_format, start, end, data.get("tank_id"))
+    except (aiohttp.ClientError, asyncio.TimeoutError, UpdateFailed) as err:
+        raise HomeAssistantError(f"Cannot download the history of vehicle {vehicle.vehicle_id}: {err}") from err
+    except OSError as err:
+        raise HomeAssistantError(f"Cannot write {path}: {err}") from err
+    _LOGGER.info(
+        "Exported %d fuelings of vehicle %s to %s in %.2f s (%s rows/s)",
+        result["rows"], vehicle.vehicle_id, path, result["seconds"], result["rows_per_second"],
+    )
+    return result
 
 
 def _validate_position(data: dict) -> None:
@@ -77,6 +246,11 @@ def _validate_position(data: dict) -> None:
 
 
 def _resolve_config_entry(hass: HomeAssistant, device_id: str):
+    vehicle = hass.data[DOMAIN][DATA_INDEX].by_device(device_id)
+    if vehicle:
+        return vehicle.entry
+
+    # Not loaded (yet): fall back to the registry.
     device_registry = async_get_device_registry(hass)
     device_entry = device_registry.devices.get(device_id)
     if not device_entry:
@@ -84,7 +258,7 @@ def _resolve_config_entry(hass: HomeAssistant, device_id: str):
 
     entry = next(
         (e for e in hass.config_entries.async_entries(DOMAIN)
-         if e.entry_id in device_entry.config_entries),
+         if e.entry_id in device_entry.config_entries and CONF_VEHICLE_ID in e.data),
         None
     )
     if not entry:
@@ -181,37 +355,56 @@ def _combine_charge_info(data: dict, params: dict) -> None:
         _LOGGER.debug("Combined charge_info: %s", params["charge_info"])
 
 
+async def _async_submit_or_queue(hass: HomeAssistant, entry, vehicle_id: str, tank_id: str, params: dict) -> str | None:
+    """Submit a fueling; on a retryable failure queue it and return its queue key."""
+    queue = hass.data[DOMAIN][DATA_QUEUE]
+    if queue.depth(entry.entry_id):
+        # Keep the vehicle's submissions in order behind its ones still waiting.
+        return await queue.async_enqueue(entry, vehicle_id, tank_id, params, "earlier fuelings still queued")
+    try:
+        await _submit_fueling(hass, entry, vehicle_id, tank_id, params)
+    except SubmitRetryableError as err:
+        return await queue.async_enqueue(entry, vehicle_id, tank_id, params, str(err))
+    return None
+
+
 async def _submit_fueling(hass: HomeAssistant, entry, vehicle_id: str, tank_id: str, params: dict) -> None:
     url = f"{API_BASE_URL}/vehicle/{vehicle_id}/tank/{tank_id}/fueling.json"
-    headers = {
-        "Accept": "application/json",
-        "Application-Id": entry.data[CONF_APP_TOKEN],
-        "Authorization": entry.data[CONF_BEARER_TOKEN],
-    }
-    session = async_get_clientsession(hass)
+    vehicle = hass.data[DOMAIN][DATA_INDEX].by_entry(entry.entry_id)
+    if vehicle:
+        client = vehicle.client
+    else:
+        client = async_get_client(hass, entry.data[CONF_APP_TOKEN], entry.data[CONF_BEARER_TOKEN])
     _LOGGER.info("Submitting fueling to Spritmonitor: %s", params)
 
     try:
-        async with session.post(url, data=params, headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
-            resp_text = await response.text()
-            _LOGGER.debug("Response status: %s, text: %s", response.status, resp_text)
-            try:
-                resp_json = await response.json()
-            except Exception:
-                resp_json = {"raw_response": resp_text}
+        response = await client.async_request("POST", url, data=params, idempotent=False)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+        raise SubmitRetryableError(f"Connection error: {err}") from err
 
-            if response.status != 200:
-                error_msg = resp_json.get("errors", resp_json.get("message", resp_text))
-                raise HomeAssistantError(f"API Error ({response.status}): {error_msg}")
-            if resp_json.get("errors"):
-                raise HomeAssistantError(f"API Errors: {resp_json['errors']}")
-
-            _LOGGER.info("Fueling successfully added for vehicle %s (tank %s)", vehicle_id, tank_id)
-
-            coordinator = hass.data.get(DOMAIN, {}).get(entry.entry_id)
-            if coordinator:
-                _LOGGER.debug("Refreshing data coordinator for vehicle %s", vehicle_id)
-                await coordinator.async_request_refresh()
-
-    except aiohttp.ClientError as err:
-        raise HomeAssistantError(f"Connection error: {err}") from err
+    resp_text = response.text
+    _LOGGER.debug("Response status: %s, text: %s", response.status, resp_text)
+    try:
+        resp_json = response.json()
+    except Exception:
+        resp_json = {"raw_response": resp_text}
+
+    if response.status in RETRY_STATUSES:
+        raise SubmitRetryableError(f"API unavailable ({response.status})")
+    if response.status != 200:
+        error_msg = resp_json.get("errors", resp_json.get("message", resp_text))
+        raise HomeAssistantError(f"API Error ({response.status}): {error_msg}")
+    if resp_json.get("errors"):
+        raise HomeAssistantError(f"API Errors: {resp_json['errors']}")
+
+    _LOGGER.info("Fueling successfully added for vehicle %s (tank %s)", vehicle_id, tank_id)
+
+
+async def _async_refresh_after_write(hass: HomeAssistant, entry) -> None:
+    vehicle = hass.data[DOMAIN][DATA_INDEX].by_entry(entry.entry_id)
+    if vehicle:
+        coordinator = vehicle.coordinator
+        _LOGGER.debug("Refreshing data coordinator for vehicle %s", coordinator.vehicle_id)
+        coordinator.account.async_invalidate()
+        coordinator.scheduler.async_start_burst("fueling added")
+        await coordinator.async_request_refresh()
@@ -0,0 +1,65 @@
+"""Persisted coordinator snapshot used to warm start a Spritmonitor vehicle."""
+
+import logging
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    SNAPSHOT_STORAGE_VERSION,
+    SNAPSHOT_SCHEMA_VERSION,
+    SNAPSHOT_SAVE_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def snapshot_store(hass: HomeAssistant, vehicle_id) -> Store:
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.snapshot_{vehicle_id}")
+
+
+class CoordinatorSnapshot:
+    """Last successful API payload of one vehicle.
+
+    Only the account slice (vehicle info and reminders) is kept here; the
+    fuelings are already persisted by FuelingHistory.
+    """
+
+    def __init__(self, hass: HomeAssistant, vehicle_id) -> None:
+        self._store = snapshot_store(hass, vehicle_id)
+        self._payload: dict | None = None
+
+    async def async_load(self) -> dict | None:
+        """Return the stored payload, or None if missing or from another schema."""
+        stored = await self._store.async_load()
+        if not stored:
+            return None
+        if stored.get("schema") != SNAPSHOT_SCHEMA_VERSION:
+            _LOGGER.debug("Ignoring snapshot with schema %s", stored.get("schema"))
+            return None
+        return stored
+
+    def async_save(self, vehicle: dict, reminders: list | None) -> None:
+        """Schedule a write of the latest payload."""
+        self._payload = {
+            "schema": SNAPSHOT_SCHEMA_VERSION,
+            "saved_at": dt_util.utcnow().isoformat(),
+            "vehicle": vehicle,
+            "reminders": reminders,
+        }
+        self._store.async_delay_save(lambda: self._payload, SNAPSHOT_SAVE_DELAY)
+
+
+def snapshot_meta(stored: dict, update_interval: timedelta) -> dict:
+    """Describe a restored snapshot: when it was saved, its age and whether it is stale."""
+    saved_at = dt_util.parse_datetime(stored.get("saved_at") or "")
+    age = dt_util.utcnow() - saved_at if saved_at else None
+    return {
+        "restored_from_snapshot": True,
+        "snapshot_saved_at": stored.get("saved_at"),
+        "snapshot_age": round(age.total_seconds()) if age else None,
+        "stale": age is None or age > update_interval * 2,
+    }
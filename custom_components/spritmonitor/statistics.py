@@ -0,0 +1,119 @@
+"""Export the fueling history of a vehicle as Home Assistant long-term statistics."""
+
+import asyncio
+import logging
+from collections.abc import Iterable
+from datetime import datetime
+from itertools import chain
+
+from homeassistant.components.recorder import get_instance
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import (
+    async_add_external_statistics,
+    get_last_statistics,
+)
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN, VEHICLE_TYPE_ELECTRIC
+from .models import FuelingRow
+
+_LOGGER = logging.getLogger(__name__)
+
+STATISTIC_KINDS = ("cost", "distance", "fuel", "energy")
+
+
+def statistic_id(vehicle_id, kind: str) -> str:
+    return f"{DOMAIN}:{vehicle_id}_{kind}"
+
+
+def _bucket(row: FuelingRow) -> datetime:
+    """Hour (UTC) a fueling is booked in: the start of its local day.
+
+    Fuelings only carry a date. The UTC hour is floored so that time zones
+    with half-hour offsets still land on a full hour, as the recorder requires.
+    """
+    start = dt_util.as_utc(dt_util.start_of_local_day(row.date))
+    return start.replace(minute=0, second=0, microsecond=0)
+
+
+def _sums(rows: Iterable[FuelingRow], field: str) -> dict[datetime, float]:
+    buckets: dict[datetime, float] = {}
+    for row in rows:
+        value = getattr(row, field)
+        if value:
+            start = _bucket(row)
+            buckets[start] = buckets.get(start, 0.0) + value
+    return buckets
+
+
+class StatisticsExporter:
+    """Write cost, distance, fuel and energy of a vehicle as external statistics.
+
+    Each statistic (`spritmonitor:<vehicle_id>_<kind>`) has one row per day
+    with fuelings: `state` is that day's amount and `sum` the running total.
+    An import starts at the last stored row (rewritten, in case more fuelings
+    were logged that day), so after the first backfill only new days are
+    written. Fuelings edited or backdated before the last stored day are not
+    picked up.
+    """
+
+    def __init__(self, hass: HomeAssistant, vehicle_id, currency: str | None) -> None:
+        self.hass = hass
+        self.vehicle_id = vehicle_id
+        self.currency = currency
+        self.synced = False
+        self._lock = asyncio.Lock()
+
+    def _series(self, data: dict, vehicle_type: str) -> list[tuple]:
+        """(kind, label, unit, rows, field) of every statistic of this vehicle."""
+        units = data.get("units") or {}
+        series = [
+            ("cost", "cost", self.currency, chain(data["gas_refuelings"], data["electric_charges"]), "cost"),
+            ("distance", "distance", units.get("trip"), data["refuelings"], "trip"),
+        ]
+        if vehicle_type != VEHICLE_TYPE_ELECTRIC:
+            series.append(("fuel", "fuel", units.get("quantity"), data["gas_refuelings"], "quantity"))
+        if data["electric_charges"]:
+            series.append(("energy", "energy charged", "kWh", data["electric_charges"], "quantity"))
+        return series
+
+    async def async_import(self, data: dict, vehicle_type: str) -> None:
+        async with self._lock:
+            vehicle = data.get("vehicle") or {}
+            name = f"{vehicle.get('make', '')} {vehicle.get('model', '')}".strip() or f"Spritmonitor {self.vehicle_id}"
+            for kind, label, unit, rows, field in self._series(data, vehicle_type):
+                stat_id = statistic_id(self.vehicle_id, kind)
+                metadata = StatisticMetaData(
+                    has_mean=False,
+                    has_sum=True,
+                    name=f"{name} {label}",
+                    source=DOMAIN,
+                    statistic_id=stat_id,
+                    unit_of_measurement=unit,
+                )
+                statistics = await self._async_new_statistics(stat_id, _sums(rows, field))
+                if statistics:
+                    async_add_external_statistics(self.hass, metadata, statistics)
+                    _LOGGER.debug("Imported %d %s statistics rows", len(statistics), stat_id)
+            self.synced = True
+
+    async def _async_new_statistics(self, stat_id: str, sums: dict[datetime, float]) -> list:
+        last = await get_instance(self.hass).async_add_executor_job(
+            get_last_statistics, self.hass, 1, stat_id, True, {"state", "sum"}
+        )
+        since, total = None, 0.0
+        if last.get(stat_id):
+            row = last[stat_id][0]
+            start = row["start"]
+            since = dt_util.utc_from_timestamp(start) if isinstance(start, (int, float)) else start
+            # Rewrite the last stored day from the sum before it.
+            total = (row.get("sum") or 0.0) - (row.get("state") or 0.0)
+
+        statistics = []
+        for start in sorted(sums):
+            if since is not None and start < since:
+                continue
+            total += sums[start]
+            statistics.append(StatisticData(start=start, state=round(sums[start], 3), sum=round(total, 3)))
+        return statistics
@@ -0,0 +1,98 @@
+"""Lookup of loaded Spritmonitor vehicles by device id, vehicle id or entry id."""
+
+import logging
+from dataclasses import dataclass
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+
+from .api import SpritmonitorClient
+from .const import DOMAIN, CONF_VEHICLE_ID
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class IndexedVehicle:
+    """Everything a service call needs to act on one vehicle."""
+
+    entry: ConfigEntry
+    coordinator: object  # SpritmonitorDataUpdateCoordinator
+    client: SpritmonitorClient
+    vehicle_id: int | str
+    device_id: str | None = None
+
+
+class VehicleIndex:
+    """Dicts from device id, vehicle id and entry id to the loaded vehicle.
+
+    Entries are added on setup and dropped on unload; device ids follow the
+    device registry, since a vehicle's device is only created once its
+    sensors are added (and can be removed or recreated later).
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._by_entry: dict[str, IndexedVehicle] = {}
+        self._by_vehicle: dict[str, str] = {}
+        self._by_device: dict[str, str] = {}
+
+    @callback
+    def async_start(self) -> None:
+        self.hass.bus.async_listen(dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_updated)
+
+    @callback
+    def async_add(self, entry: ConfigEntry, coordinator, client: SpritmonitorClient) -> None:
+        vehicle_id = entry.data[CONF_VEHICLE_ID]
+        vehicle = IndexedVehicle(entry, coordinator, client, vehicle_id)
+        self._by_entry[entry.entry_id] = vehicle
+        self._by_vehicle[str(vehicle_id)] = entry.entry_id
+        device = dr.async_get(self.hass).async_get_device(identifiers={(DOMAIN, str(vehicle_id))})
+        if device:
+            self._link_device(device.id, entry.entry_id)
+
+    @callback
+    def async_remove(self, entry_id: str) -> None:
+        vehicle = self._by_entry.pop(entry_id, None)
+        if vehicle is None:
+            return
+        self._by_vehicle.pop(str(vehicle.vehicle_id), None)
+        if vehicle.device_id:
+            self._by_device.pop(vehicle.device_id, None)
+
+    def __len__(self) -> int:
+        return len(self._by_entry)
+
+    def by_device(self, device_id: str) -> IndexedVehicle | None:
+        return self._by_entry.get(self._by_device.get(device_id))
+
+    def by_vehicle(self, vehicle_id) -> IndexedVehicle | None:
+        return self._by_entry.get(self._by_vehicle.get(str(vehicle_id)))
+
+    def by_entry(self, entry_id: str) -> IndexedVehicle | None:
+        return self._by_entry.get(entry_id)
+
+    def _link_device(self, device_id: str, entry_id: str) -> None:
+        vehicle = self._by_entry[entry_id]
+        if vehicle.device_id and vehicle.device_id != device_id:
+            self._by_device.pop(vehicle.device_id, None)
+        vehicle.device_id = device_id
+        self._by_device[device_id] = entry_id
+
+    @callback
+    def _async_device_updated(self, event: Event) -> None:
+        device_id = event.data["device_id"]
+        if event.data["action"] == "remove":
+            entry_id = self._by_device.pop(device_id, None)
+            if entry_id in self._by_entry:
+                self._by_entry[entry_id].device_id = None
+            return
+        device = dr.async_get(self.hass).async_get(device_id)
+        if device is None:
+            return
+        for domain, identifier in device.identifiers:
+            entry_id = self._by_vehicle.get(identifier) if domain == DOMAIN else None
+            if entry_id is not None:
+                self._link_device(device_id, entry_id)
+                _LOGGER.debug("Device %s linked to vehicle %s", device_id, identifier)
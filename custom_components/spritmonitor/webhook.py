@@ -0,0 +1,44 @@
+"""Per-vehicle webhook that triggers a fuelings-only refresh.
+
+An external system (a charger, a fuel app automation, ...) POSTs to
+/api/webhook/<webhook_id> after a fueling was logged; the vehicle's history
+is then synced right away instead of at the next poll. The id is generated
+once per config entry and kept in its data.
+"""
+
+import logging
+from functools import partial
+
+from aiohttp import hdrs, web
+
+from homeassistant.components import webhook
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, CONF_WEBHOOK_ID
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@callback
+def async_register_webhook(hass: HomeAssistant, entry: ConfigEntry, coordinator) -> None:
+    """Register the entry's webhook (creating its id on first use) until the entry unloads."""
+    webhook_id = entry.data.get(CONF_WEBHOOK_ID)
+    if webhook_id is None:
+        webhook_id = webhook.async_generate_id()
+        hass.config_entries.async_update_entry(entry, data={**entry.data, CONF_WEBHOOK_ID: webhook_id})
+        _LOGGER.info(
+            "Spritmonitor vehicle %s: POST to %s to refresh its fuelings",
+            coordinator.vehicle_id, webhook.async_generate_path(webhook_id),
+        )
+
+    async def handle_webhook(hass: HomeAssistant, webhook_id: str, request: web.Request) -> web.Response:
+        # Answer right away; the refresh runs (coalesced) in the background.
+        coordinator.async_schedule_fuelings_refresh()
+        return web.Response(status=202)
+
+    webhook.async_register(
+        hass, DOMAIN, f"Spritmonitor {coordinator.vehicle_id}", webhook_id, handle_webhook,
+        local_only=True, allowed_methods=[hdrs.METH_POST],
+    )
+    entry.async_on_unload(partial(webhook.async_unregister, hass, webhook_id))
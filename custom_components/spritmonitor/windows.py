@@ -0,0 +1,293 @@
+"""Rolling-window statistics of a fueling history, updated one fueling at a time.
+
+Every tank keeps one RollingWindow per configured window: the last N fuelings
+(ROLLING_WINDOW_RECORDS) and the last N days (ROLLING_WINDOW_DAYS). A window
+holds running sums, a Welford mean/variance of the consumption and monotonic
+deques for the lowest and highest price, so adding or evicting a fueling is
+O(1) and reading a value never scans the window.
+
+WindowEngine feeds each tank's windows and its calendar PeriodIndex
+(periods.py). It only pushes the fuelings that were added on top of the
+history since the last update. When the history changed in any other way
+(loaded, fully resynced, or a backdated fueling was inserted) the tank is
+replayed from scratch.
+"""
+
+from collections import deque
+from datetime import date, timedelta
+
+from .const import ROLLING_WINDOW_DAYS, ROLLING_WINDOW_RECORDS, VEHICLE_TYPE_PHEV
+from .models import FuelingRow
+from .periods import PERIOD_METRICS, PeriodIndex
+
+
+def window_name(records: int | None = None, days: int | None = None) -> str:
+    """Suffix of the analytics keys of a window, e.g. 'last10' or '30d'."""
+    return f"last{records}" if records else f"{days}d"
+
+
+def vehicle_tanks(data: dict, vehicle_type: str) -> dict[str, list[FuelingRow]]:
+    """Fueling lists the windows are kept for, keyed by sensor suffix (as in analytics.py)."""
+    if vehicle_type == VEHICLE_TYPE_PHEV:
+        return {"_fuel": data.get("gas_refuelings", []), "_electric": data.get("electric_charges", [])}
+    return {"": data.get("refuelings", [])}
+
+
+class _Welford:
+    """Running mean and population variance that also supports removing a value."""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def remove(self, value: float) -> None:
+        self.count -= 1
+        if not self.count:
+            self.mean = self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 = max(0.0, self.m2 - delta * (value - self.mean))
+
+    @property
+    def stddev(self) -> float | None:
+        return (self.m2 / self.count) ** 0.5 if self.count else None
+
+
+class _Extreme:
+    """Minimum or maximum of a sliding window.
+
+    The deque holds (seq, value) pairs in window order whose values only
+    decrease (maximum) or increase (minimum); the front is the answer.
+    """
+
+    __slots__ = ("_items", "_largest")
+
+    def __init__(self, largest: bool) -> None:
+        self._items: deque[tuple[int, float]] = deque()
+        self._largest = largest
+
+    def push(self, seq: int, value: float) -> None:
+        items = self._items
+        if self._largest:
+            while items and items[-1][1] <= value:
+                items.pop()
+        else:
+            while items and items[-1][1] >= value:
+                items.pop()
+        items.append((seq, value))
+
+    def evict(self, seq: int) -> None:
+        if self._items and self._items[0][0] == seq:
+            self._items.popleft()
+
+    @property
+    def value(self) -> float | None:
+        return self._items[0][1] if self._items else None
+
+
+class RollingWindow:
+    """The last `records` fuelings, or the fuelings of the last `days` days, of one tank.
+
+    The filters match the fixed-window calculators in analytics.py: only
+    positive consumptions count, prices need a cost and a positive quantity,
+    and cost per distance uses fuelings with both a cost and a positive trip.
+    """
+
+    __slots__ = (
+        "records", "days", "_entries", "_consumption", "_price_min", "_price_max",
+        "_prices", "_cost", "_billed", "_billed_cost", "_billed_trip",
+    )
+
+    def __init__(self, records: int | None = None, days: int | None = None) -> None:
+        self.records = records
+        self.days = days
+        # (seq, date, consumption, price, cost, billed trip) per fueling in the window
+        self._entries: deque[tuple] = deque()
+        self._consumption = _Welford()
+        self._price_min = _Extreme(largest=False)
+        self._price_max = _Extreme(largest=True)
+        self._prices = 0
+        self._cost = 0.0
+        self._billed = 0
+        self._billed_cost = 0.0
+        self._billed_trip = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def push(self, seq: int, row: FuelingRow) -> None:
+        """Add a fueling that is not older than any fueling already in the window."""
+        consumption = row.consumption if row.consumption and row.consumption > 0 else None
+        price = row.cost / row.quantity if row.cost and row.quantity and row.quantity > 0 else None
+        cost = row.cost or 0.0
+        billed_trip = row.trip if cost and row.trip and row.trip > 0 else 0.0
+        self._entries.append((seq, row.date, consumption, price, cost, billed_trip))
+        if consumption is not None:
+            self._consumption.add(consumption)
+        if price is not None:
+            self._price_min.push(seq, price)
+            self._price_max.push(seq, price)
+            self._prices += 1
+        self._cost += cost
+        if billed_trip:
+            self._billed += 1
+            self._billed_cost += cost
+            self._billed_trip += billed_trip
+
+        if self.records is not None:
+            if len(self._entries) > self.records:
+                self._evict()
+        else:
+            # Nothing older than `days` before the newest fueling can be in the window any more.
+            self.expire(row.date)
+
+    def expire(self, today: date) -> None:
+        """Drop the fuelings that fell out of a day window by `today`."""
+        if self.days is None:
+            return
+        first_day = today - timedelta(days=self.days - 1)
+        while self._entries and self._entries[0][1] < first_day:
+            self._evict()
+
+    def _evict(self) -> None:
+        seq, _, consumption, price, cost, billed_trip = self._entries.popleft()
+        if consumption is not None:
+            self._consumption.remove(consumption)
+        if price is not None:
+            self._price_min.evict(seq)
+            self._price_max.evict(seq)
+            self._prices -= 1
+        if not self._entries:
+            # Start over from exact zeros instead of carrying rounding residue.
+            self._cost = self._billed_cost = self._billed_trip = 0.0
+            self._billed = 0
+            return
+        self._cost -= cost
+        if billed_trip:
+            self._billed -= 1
+            if self._billed:
+                self._billed_cost -= cost
+                self._billed_trip -= billed_trip
+            else:
+                self._billed_cost = self._billed_trip = 0.0
+
+    def values(self) -> dict:
+        consumption = self._consumption
+        return {
+            "consumption": round(consumption.mean, 2) if consumption.count else None,
+            "consumption_stddev": round(consumption.stddev, 2) if consumption.count >= 2 else None,
+            "price_spread": (
+                round(self._price_max.value - self._price_min.value, 3) if self._prices >= 2 else None
+            ),
+            "cost_per_distance": (
+                round(self._billed_cost / self._billed_trip, 2) if self._billed else None
+            ),
+            "cost": round(self._cost, 2),
+        }
+
+
+class _TankWindows:
+    """Windows and period index of one tank plus what is needed to tell appended fuelings apart."""
+
+    __slots__ = ("windows", "periods", "pushed", "newest")
+
+    def __init__(self, records: tuple[int, ...], days: tuple[int, ...]) -> None:
+        self.windows = {window_name(records=n): RollingWindow(records=n) for n in records}
+        self.windows.update({window_name(days=n): RollingWindow(days=n) for n in days})
+        self.periods = PeriodIndex()
+        self.pushed = 0
+        self.newest: FuelingRow | None = None
+
+    def added(self, rows: list[FuelingRow]) -> list[FuelingRow] | None:
+        """Rows (newest first) on top of those already pushed; None if the rest differs."""
+        added = len(rows) - self.pushed
+        if added < 0 or (self.pushed and rows[added] != self.newest):
+            return None
+        return rows[:added]
+
+    def push(self, rows: list[FuelingRow]) -> None:
+        """Push rows (newest first); each window only gets the rows that can still be in it.
+
+        On a replay this skips most of the history instead of pushing and
+        evicting every fueling.
+        """
+        if not rows:
+            return
+        for window in self.windows.values():
+            if window.records is not None:
+                count = min(len(rows), window.records)
+            else:
+                first_day = rows[0].date - timedelta(days=window.days - 1)
+                count = 0
+                while count < len(rows) and rows[count].date >= first_day:
+                    count += 1
+            seq = self.pushed + len(rows) - count
+            for row in reversed(rows[:count]):
+                window.push(seq, row)
+                seq += 1
+        for row in rows:
+            self.periods.push(row)
+        self.pushed += len(rows)
+        self.newest = rows[0]
+
+
+class WindowEngine:
+    """Rolling windows of every tank of one vehicle, fed incrementally from its history."""
+
+    def __init__(
+        self, records: tuple[int, ...] = ROLLING_WINDOW_RECORDS, days: tuple[int, ...] = ROLLING_WINDOW_DAYS,
+    ) -> None:
+        self.records = records
+        self.days = days
+        self._tanks: dict[str, _TankWindows] = {}
+        self._revision = None
+        self.replays = 0
+
+    def update(self, tanks: dict[str, list[FuelingRow]], today: date, revision: int) -> dict:
+        """Feed the new fuelings and return every window and period value keyed by sensor id.
+
+        `revision` is FuelingHistory.revision; a different value means the
+        history was replaced and every tank is replayed.
+        """
+        if revision != self._revision:
+            self._tanks.clear()
+            self._revision = revision
+        results = {}
+        for suffix, rows in tanks.items():
+            tank = self._tanks.get(suffix)
+            added = tank.added(rows) if tank is not None else None
+            if added is None:
+                tank = self._tanks[suffix] = _TankWindows(self.records, self.days)
+                added = rows
+                self.replays += 1
+            tank.push(added)
+            for name, window in tank.windows.items():
+                window.expire(today)
+                for metric, value in window.values().items():
+                    results[f"window_{metric}_{name}{suffix}"] = value
+            for period, values in tank.periods.values(today).items():
+                for metric in PERIOD_METRICS:
+                    results[f"period_{metric}_{period}{suffix}"] = values[metric] if values else None
+        return results
+
+    def as_dict(self) -> dict:
+        return {
+            "replays": self.replays,
+            "tanks": {
+                suffix or "main": {
+                    "months": len(tank.periods),
+                    **{name: len(window) for name, window in tank.windows.items()},
+                }
+                for suffix, tank in self._tanks.items()
+            },
+        }
@@ -0,0 +1,238 @@
+"""Durable outbound queue for fuelings that could not be submitted right away."""
+
+import hashlib
+import json
+import logging
+import math
+from collections.abc import Awaitable, Callable
+from functools import partial
+
+from homeassistant.components import persistent_notification
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    QUEUE_STORAGE_VERSION,
+    QUEUE_RETRY_BASE_DELAY,
+    QUEUE_RETRY_MAX_DELAY,
+    SIGNAL_QUEUE_UPDATED,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SubmitRetryableError(Exception):
+    """A submission failed in a way that may succeed later (network, 429, 5xx)."""
+
+
+# (entry, vehicle_id, tank_id, params) -> None; raises SubmitRetryableError or HomeAssistantError
+Submit = Callable[..., Awaitable[None]]
+
+
+def idempotency_key(vehicle_id, tank_id, params: dict) -> str:
+    """Stable key of one fueling, so queueing the same submission twice keeps one copy."""
+    payload = json.dumps([str(vehicle_id), str(tank_id), params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def recorded_fields(tank_id, params: dict) -> dict:
+    """The FuelingRow fields a submission shows up with in the history, by attribute name.
+
+    Every submitted value the history keeps is included, so a different
+    fueling of the same day and quantity is not taken for this one. The
+    price only maps to the row's cost when it is a total price.
+    """
+    fields = {
+        "date_str": params["date"],
+        "tank_id": int(tank_id),
+        "quantity": float(params["quantity"]),
+        "trip": float(params["trip"]),
+        "type": params["type"],
+    }
+    if params.get("odometer") is not None:
+        fields["odometer"] = float(params["odometer"])
+    if params.get("price") is not None and str(params.get("pricetype", "0")) == "0":
+        fields["cost"] = float(params["price"])
+    for name in ("location", "country"):
+        if params.get(name):
+            fields[name] = params[name]
+    return fields
+
+
+def _same(value, expected) -> bool:
+    # The API may hand back a submitted amount with less precision.
+    if isinstance(expected, float):
+        return value is not None and math.isclose(value, expected, abs_tol=0.005)
+    return value == expected
+
+
+class FuelingWriteQueue:
+    """Pending add_fueling submissions, persisted in a Store, one FIFO per config entry.
+
+    Each entry's items are replayed in order by that entry's background timer.
+    A retryable failure stops the entry's replay and reschedules it with
+    exponential backoff (QUEUE_RETRY_BASE_DELAY doubling up to
+    QUEUE_RETRY_MAX_DELAY), without holding back the other entries; a
+    permanent failure (rejected by the API) drops the item with an error in
+    the log. Before posting, an item whose fueling already shows up in the
+    vehicle's history is dropped, in case an earlier attempt reached the
+    server after all.
+
+    While a vehicle has fuelings queued, a persistent notification says so.
+    """
+
+    def __init__(self, hass: HomeAssistant, submit: Submit) -> None:
+        self.hass = hass
+        self._submit = submit
+        self._store = Store(hass, QUEUE_STORAGE_VERSION, f"{DOMAIN}.write_queue")
+        self.items: list[dict] = []
+        self._failures: dict[str, int] = {}
+        self._timers: dict[str, Callable[[], None]] = {}
+        self._replaying: set[str] = set()
+
+    async def async_load(self) -> None:
+        stored = await self._store.async_load()
+        self.items = (stored or {}).get("items", [])
+        if self.items:
+            _LOGGER.info("%d queued fuelings waiting to be submitted", len(self.items))
+        for entry_id in self._entry_ids():
+            self._schedule(entry_id, QUEUE_RETRY_BASE_DELAY)
+
+    @callback
+    def async_stop(self) -> None:
+        for unsub in self._timers.values():
+            unsub()
+        self._timers.clear()
+
+    def depth(self, entry_id: str | None = None) -> int:
+        return sum(1 for item in self.items if entry_id in (None, item["entry_id"]))
+
+    def oldest_age(self, entry_id: str | None = None) -> float | None:
+        """Seconds since the oldest pending item was queued."""
+        queued = [item["queued_at"] for item in self.items if entry_id in (None, item["entry_id"])]
+        if not queued:
+            return None
+        return (dt_util.utcnow() - dt_util.parse_datetime(min(queued))).total_seconds()
+
+    async def async_enqueue(self, entry, vehicle_id, tank_id, params: dict, error: str) -> str:
+        """Persist a submission for later replay and return its idempotency key."""
+        key = idempotency_key(vehicle_id, tank_id, params)
+        if not any(item["key"] == key for item in self.items):
+            self.items.append({
+                "key": key,
+                "entry_id": entry.entry_id,
+                "vehicle_id": vehicle_id,
+                "tank_id": tank_id,
+                "params": params,
+                "queued_at": dt_util.utcnow().isoformat(),
+                "attempts": 0,
+                "last_error": error,
+            })
+            await self._async_changed()
+        _LOGGER.warning("Fueling for vehicle %s queued for retry (%s): %s", vehicle_id, key, error)
+        persistent_notification.async_create(
+            self.hass,
+            f"{self.depth(entry.entry_id)} fueling(s) of vehicle {vehicle_id} could not be sent to "
+            f"Spritmonitor yet and will be retried automatically. Last error: {error}",
+            title="Spritmonitor: fuelings queued",
+            notification_id=_notification_id(entry.entry_id),
+        )
+        if entry.entry_id not in self._timers and entry.entry_id not in self._replaying:
+            self._schedule(entry.entry_id, self._delay(entry.entry_id))
+        return key
+
+    def _entry_ids(self) -> list[str]:
+        return list(dict.fromkeys(item["entry_id"] for item in self.items))
+
+    def _head(self, entry_id: str) -> dict | None:
+        return next((item for item in self.items if item["entry_id"] == entry_id), None)
+
+    def _delay(self, entry_id: str) -> float:
+        return min(QUEUE_RETRY_BASE_DELAY * 2 ** self._failures.get(entry_id, 0), QUEUE_RETRY_MAX_DELAY)
+
+    def _schedule(self, entry_id: str, delay: float) -> None:
+        if unsub := self._timers.pop(entry_id, None):
+            unsub()
+        self._timers[entry_id] = async_call_later(self.hass, delay, partial(self._async_timer_fired, entry_id))
+
+    async def _async_timer_fired(self, entry_id: str, _now) -> None:
+        self._timers.pop(entry_id, None)
+        await self.async_replay(entry_id)
+
+    async def async_replay(self, entry_id: str | None = None) -> None:
+        """Submit the pending items of one entry, or of every entry, each entry's in order.
+
+        An entry's replay ends when its items are gone or the API fails again.
+        """
+        for replayed in [entry_id] if entry_id else self._entry_ids():
+            if replayed in self._replaying:
+                continue
+            self._replaying.add(replayed)
+            try:
+                await self._async_replay(replayed)
+            finally:
+                self._replaying.discard(replayed)
+
+    async def _async_replay(self, entry_id: str) -> None:
+        entry = self.hass.config_entries.async_get_entry(entry_id)
+        submitted = False
+        while (item := self._head(entry_id)) is not None:
+            if entry is None:
+                _LOGGER.warning("Dropping queued fueling %s: its vehicle was removed", item["key"])
+            elif self._already_recorded(item):
+                _LOGGER.info("Queued fueling %s already recorded, dropping it", item["key"])
+            else:
+                item["attempts"] += 1
+                try:
+                    await self._submit(entry, item["vehicle_id"], item["tank_id"], item["params"])
+                except SubmitRetryableError as err:
+                    item["last_error"] = str(err)
+                    self._failures[entry_id] = self._failures.get(entry_id, 0) + 1
+                    await self._async_changed()
+                    _LOGGER.debug(
+                        "Queue replay of vehicle %s paused (%s), next try in %d s",
+                        item["vehicle_id"], err, self._delay(entry_id),
+                    )
+                    self._schedule(entry_id, self._delay(entry_id))
+                    break
+                except HomeAssistantError as err:
+                    _LOGGER.error("Queued fueling %s rejected, dropping it: %s", item["key"], err)
+                else:
+                    submitted = True
+            self._failures.pop(entry_id, None)
+            self.items.remove(item)
+            await self._async_changed()
+            if not self.depth(entry_id):
+                persistent_notification.async_dismiss(self.hass, _notification_id(entry_id))
+
+        coordinator = self.hass.data.get(DOMAIN, {}).get(entry_id) if submitted else None
+        if coordinator:
+            coordinator.account.async_invalidate()
+            coordinator.scheduler.async_start_burst("queued fuelings submitted")
+            await coordinator.async_request_refresh()
+
+    def _already_recorded(self, item: dict) -> bool:
+        coordinator = self.hass.data.get(DOMAIN, {}).get(item["entry_id"])
+        if coordinator is None:
+            return False
+        try:
+            expected = recorded_fields(item["tank_id"], item["params"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return any(
+            all(_same(getattr(row, name), value) for name, value in expected.items())
+            for row in coordinator.history.rows
+        )
+
+    async def _async_changed(self) -> None:
+        await self._store.async_save({"items": self.items})
+        async_dispatcher_send(self.hass, SIGNAL_QUEUE_UPDATED)
+
+
+def _notification_id(entry_id: str) -> str:
+    return f"{DOMAIN}_write_queue_{entry_id}"
@@ -0,0 +1,142 @@
+"""Fixtures for the Spritmonitor tests."""
+
+from datetime import date, timedelta
+
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse
+
+from custom_components.spritmonitor.const import (
+    API_FUELINGS_URL_TPL,
+    API_REMINDERS_URL,
+    API_VEHICLES_URL,
+    CONF_APP_TOKEN,
+    CONF_BEARER_TOKEN,
+    CONF_CURRENCY,
+    CONF_UPDATE_INTERVAL,
+    CONF_VEHICLE_ID,
+    CONF_VEHICLE_TYPE,
+    DOMAIN,
+    VEHICLE_TYPE_COMBUSTION,
+)
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+VEHICLE_ID = 1234
+VEHICLE = {
+    "id": VEHICLE_ID,
+    "make": "Skoda",
+    "model": "Octavia",
+    "sign": "M-AB 123",
+    "tripunit": "km",
+    "consumptionunit": "l/100km",
+    "capacity": "50",
+    "consumption": "6.2",
+    "tripsum": "12000",
+    "quantitysum": "744",
+    "rankingInfo": {"rank": 3, "total": 10, "min": "4.9", "avg": "6.8"},
+}
+ENTRY_DATA = {
+    CONF_VEHICLE_ID: VEHICLE_ID,
+    CONF_APP_TOKEN: "app",
+    CONF_BEARER_TOKEN: "Bearer token",
+    CONF_VEHICLE_TYPE: VEHICLE_TYPE_COMBUSTION,
+    CONF_CURRENCY: "EUR",
+    CONF_UPDATE_INTERVAL: 24,
+}
+
+
+def fueling(fueling_id: int, day: date, tank_id: int = 1, quantity: float = 40.0, **fields) -> dict:
+    """One fuelings.json record."""
+    return {
+        "id": fueling_id,
+        "date": day.strftime("%d.%m.%Y"),
+        "odometer": 10000 + fueling_id * 600,
+        "trip": 600,
+        "quantity": quantity,
+        "cost": quantity * 1.8,
+        "consumption": round(quantity / 6, 2),
+        "tankid": tank_id,
+        "type": "full",
+        **fields,
+    }
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(recorder_mock, enable_custom_integrations):
+    """Let Home Assistant load custom_components/spritmonitor (which depends on the recorder)."""
+    yield
+
+
+@pytest.fixture
+def fuelings() -> list[dict]:
+    """The vehicle's fuelings as served by the mocked API, newest first; tests may edit it."""
+    today = date.today()
+    return [fueling(20 - n, today - timedelta(days=7 * n)) for n in range(20)]
+
+
+@pytest.fixture
+def vehicles() -> list[dict]:
+    """The account's vehicles as served by vehicles.json; tests may add to it."""
+    return [dict(VEHICLE)]
+
+
+@pytest.fixture
+def reminders() -> list[dict]:
+    """The account's reminders as served by reminders.json; tests may edit it."""
+    return []
+
+
+@pytest.fixture
+def api_errors() -> dict[str, int]:
+    """URL -> error status the mocked API answers with instead; tests may add to it."""
+    return {}
+
+
+@pytest.fixture
+def mock_api(aioclient_mock, vehicles, reminders, fuelings, api_errors):
+    """Serve vehicles.json, reminders.json and the paged fuelings of VEHICLE.
+
+    Any other vehicle added to `vehicles` has no fuelings.
+    """
+
+    def respond(method, url, payload):
+        status = api_errors.get(str(url.with_query(None)))
+        if status:
+            return AiohttpClientMockResponse(method, url, status=status, text="error")
+        return AiohttpClientMockResponse(method, url, json=payload)
+
+    async def vehicles_json(method, url, data):
+        return respond(method, url, vehicles)
+
+    async def reminders_json(method, url, data):
+        return respond(method, url, reminders)
+
+    async def fuelings_page(method, url, data):
+        limit, offset = int(url.query["limit"]), int(url.query["offset"])
+        return respond(method, url, fuelings[offset:offset + limit])
+
+    aioclient_mock.get(API_VEHICLES_URL, side_effect=vehicles_json)
+    aioclient_mock.get(API_REMINDERS_URL, side_effect=reminders_json)
+    aioclient_mock.get(API_FUELINGS_URL_TPL.format(vehicle_id=VEHICLE_ID), side_effect=fuelings_page)
+    return aioclient_mock
+
+
+async def async_add_vehicle_entry(hass, vehicle_id: int = VEHICLE_ID) -> MockConfigEntry:
+    """Set up an entry for one of the mocked vehicles and wait for its first live update."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, data={**ENTRY_DATA, CONF_VEHICLE_ID: vehicle_id}, unique_id=f"spritmonitor_{vehicle_id}",
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
+
+
+@pytest.fixture
+async def vehicle_entry(hass, mock_api):
+    """A loaded vehicle entry whose first live update has finished."""
+    entry = await async_add_vehicle_entry(hass)
+    yield entry
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,26 @@
+"""Tests for the Spritmonitor config flow."""
+
+from homeassistant import config_entries
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.spritmonitor.const import (
+    CONF_BEARER_TOKEN,
+    CONF_VEHICLE_ID,
+    DATA_CLIENTS,
+    DOMAIN,
+)
+
+from .conftest import ENTRY_DATA
+
+
+async def test_rejected_vehicle_leaves_no_client_behind(hass, mock_api) -> None:
+    """Token pairs tried in the form are not registered as shared clients."""
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": config_entries.SOURCE_USER})
+    for bearer_token in ("Bearer typo", "Bearer other"):
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {**ENTRY_DATA, CONF_VEHICLE_ID: 9999, CONF_BEARER_TOKEN: bearer_token},
+        )
+        assert result["type"] == FlowResultType.FORM
+        assert result["errors"] == {"base": "invalid_auth"}
+
+    assert not hass.data.get(DOMAIN, {}).get(DATA_CLIENTS)
@@ -0,0 +1,90 @@
+"""Tests for the vehicle coordinator."""
+
+from datetime import date, timedelta
+
+from custom_components.spritmonitor.const import (
+    API_FUELINGS_URL_TPL,
+    API_REMINDERS_URL,
+    API_VEHICLES_URL,
+    DATA_ACCOUNTS,
+    DOMAIN,
+    SCHEDULER_BURST_INTERVAL,
+    SCHEDULER_JITTER,
+)
+
+from .conftest import VEHICLE, async_add_vehicle_entry, fueling
+
+
+async def test_date_rollover_rebuilds_without_burst(hass, vehicle_entry) -> None:
+    """A payload rebuilt only for the new day is not a change of the vehicle's data."""
+    coordinator = hass.data[DOMAIN][vehicle_entry.entry_id]
+    today = coordinator.data["meta"]["computed_on"]
+    # As if the payload had been built yesterday.
+    coordinator.data["meta"]["computed_on"] = (date.fromisoformat(today) - timedelta(days=1)).isoformat()
+
+    await coordinator.async_refresh()
+
+    assert coordinator.data["meta"]["computed_on"] == today
+    assert coordinator.update_interval != SCHEDULER_BURST_INTERVAL
+    assert coordinator.scheduler.decisions[-1]["reason"] != "burst"
+
+
+async def test_new_fueling_starts_burst(hass, vehicle_entry, fuelings) -> None:
+    coordinator = hass.data[DOMAIN][vehicle_entry.entry_id]
+    fuelings.insert(0, fueling(21, date.today()))
+
+    await coordinator.async_refresh()
+
+    assert coordinator.data["analytics"]["last_refuel_odometer"] == fuelings[0]["odometer"]
+    assert coordinator.update_interval == SCHEDULER_BURST_INTERVAL
+
+
+async def test_account_cache_expires_before_the_earliest_jittered_poll(hass, vehicle_entry) -> None:
+    coordinator = hass.data[DOMAIN][vehicle_entry.entry_id]
+    earliest = coordinator.scheduler.base_interval * (1 - SCHEDULER_JITTER)
+    assert timedelta(0) < coordinator.account.cache_ttl < earliest
+
+
+async def test_account_outlives_the_entry_that_created_it(hass, vehicle_entry, vehicles, mock_api) -> None:
+    """Unloading the first vehicle must not shut down the account the second one still reads."""
+    vehicles.append({**VEHICLE, "id": 5678, "model": "Fabia"})
+    mock_api.get(API_FUELINGS_URL_TPL.format(vehicle_id=5678), json=[])
+    second = await async_add_vehicle_entry(hass, 5678)
+    coordinator = hass.data[DOMAIN][second.entry_id]
+    account = coordinator.account
+    assert account.config_entry is None
+
+    await hass.config_entries.async_unload(vehicle_entry.entry_id)
+    vehicles[1]["model"] = "Fabia Combi"
+    account.async_invalidate()
+    await coordinator.async_refresh()
+    assert account.data["vehicles"][5678]["model"] == "Fabia Combi"
+
+    await hass.config_entries.async_unload(second.entry_id)
+    assert not hass.data[DOMAIN][DATA_ACCOUNTS]
+    # Shut down with its last member: further refreshes are ignored.
+    vehicles[1]["model"] = "Fabia Scout"
+    account.async_invalidate()
+    await account.async_refresh()
+    assert account.data["vehicles"][5678]["model"] == "Fabia Combi"
+
+
+async def test_reminders_come_back_after_a_failed_fetch(hass, vehicle_entry, reminders, api_errors) -> None:
+    """A failure drops the reminders; the same body as before the failure must restore them."""
+    account = hass.data[DOMAIN][vehicle_entry.entry_id].account
+    reminders.append({"id": 1, "vehicle": VEHICLE["id"], "type": 1, "nextodometer": 30000})
+
+    async def refresh() -> None:
+        account.async_invalidate()
+        await account.async_get_data()
+
+    await refresh()
+    assert account.vehicle_slice(VEHICLE["id"])[1] == reminders
+
+    api_errors[API_REMINDERS_URL] = 404
+    await refresh()
+    assert account.vehicle_slice(VEHICLE["id"])[1] is None
+
+    del api_errors[API_REMINDERS_URL]
+    await refresh()
+    assert account.vehicle_slice(VEHICLE["id"])[1] == reminders
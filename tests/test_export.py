@@ -0,0 +1,28 @@
+"""Tests for the export_history service."""
+
+import json
+from datetime import date, timedelta
+
+from homeassistant.helpers import device_registry as dr
+
+from custom_components.spritmonitor.const import DOMAIN, HISTORY_PAGE_SIZE
+
+from .conftest import VEHICLE_ID, fueling
+
+
+async def test_export_from_the_api_pages_through_every_fueling(hass, vehicle_entry, fuelings, tmp_path) -> None:
+    oldest = date.today() - timedelta(days=7 * len(fuelings))
+    fuelings.extend(fueling(-n, oldest - timedelta(days=n)) for n in range(HISTORY_PAGE_SIZE))
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, str(VEHICLE_ID))})
+    path = tmp_path / "history.jsonl"
+
+    response = await hass.services.async_call(
+        DOMAIN, "export_history",
+        {"vehicle_device": device.id, "format": "jsonl", "source": "api", "file_path": str(path)},
+        blocking=True, return_response=True,
+    )
+
+    assert response["rows"] == len(fuelings)
+    exported = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["id"] for record in exported] == [record["id"] for record in fuelings]
@@ -0,0 +1,99 @@
+"""Tests for the incrementally synced fueling history."""
+
+from datetime import date, timedelta
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from custom_components.spritmonitor.const import (
+    DOMAIN,
+    HISTORY_FULL_RESYNC_INTERVAL,
+    HISTORY_PAGE_SIZE,
+    HISTORY_PROBE_SIZE,
+    HISTORY_STORAGE_VERSION,
+)
+from custom_components.spritmonitor.history import FuelingHistory
+
+from .conftest import VEHICLE_ID, fueling
+
+
+class FakeApi:
+    """fuelings.json of one vehicle, newest first, recording the pages requested."""
+
+    def __init__(self, records: list[dict]) -> None:
+        self.records = records
+        self.pages: list[tuple[int, int]] = []
+
+    async def fetch_page(self, limit: int, offset: int) -> list:
+        self.pages.append((limit, offset))
+        return self.records[offset:offset + limit]
+
+
+@pytest.fixture
+def stored(hass_storage, fuelings):
+    """Store the vehicle's history as last fully synced `age` ago."""
+
+    def store(age: timedelta) -> None:
+        hass_storage[f"{DOMAIN}.history_{VEHICLE_ID}"] = {
+            "version": HISTORY_STORAGE_VERSION,
+            "key": f"{DOMAIN}.history_{VEHICLE_ID}",
+            "data": {"fuelings": list(fuelings), "full_sync_at": (dt_util.utcnow() - age).isoformat()},
+        }
+
+    return store
+
+
+async def test_recent_history_only_probes_the_newest_page(hass, stored, fuelings) -> None:
+    stored(timedelta(days=1))
+    api = FakeApi([fueling(21, date.today()), *fuelings])
+    history = FuelingHistory(hass, VEHICLE_ID)
+    await history.async_load()
+    revision = history.revision
+
+    assert await history.async_sync(api.fetch_page)
+
+    assert api.pages == [(HISTORY_PROBE_SIZE, 0)]
+    assert [row.id for row in history.rows[:2]] == [21, 20]
+    assert history.revision == revision  # extended, not replaced
+
+
+async def test_probe_pages_on_until_a_known_fueling(hass, stored, fuelings) -> None:
+    stored(timedelta(days=1))
+    new = [fueling(21 + n, date.today()) for n in range(HISTORY_PROBE_SIZE + 2)]
+    api = FakeApi([*reversed(new), *fuelings])
+    history = FuelingHistory(hass, VEHICLE_ID)
+
+    assert await history.async_sync(api.fetch_page)
+
+    assert api.pages == [(HISTORY_PROBE_SIZE, 0), (HISTORY_PAGE_SIZE, HISTORY_PROBE_SIZE)]
+    assert len(history.rows) == len(api.records)
+
+
+async def test_incremental_sync_does_not_see_edits(hass, stored, fuelings) -> None:
+    stored(timedelta(days=1))
+    api = FakeApi([{**record, "quantity": 10.0} if record["id"] == 10 else record for record in fuelings])
+    history = FuelingHistory(hass, VEHICLE_ID)
+
+    assert not await history.async_sync(api.fetch_page)
+    assert api.pages == [(HISTORY_PROBE_SIZE, 0)]
+
+
+async def test_stale_history_switches_to_a_full_resync(hass, stored, fuelings) -> None:
+    stored(HISTORY_FULL_RESYNC_INTERVAL + timedelta(hours=1))
+    edited = [{**record, "quantity": 10.0} if record["id"] == 10 else record for record in fuelings[1:]]
+    api = FakeApi(edited)  # fueling 20 deleted, fueling 10 edited
+    history = FuelingHistory(hass, VEHICLE_ID)
+    await history.async_load()
+    revision = history.revision
+
+    assert await history.async_sync(api.fetch_page)
+
+    assert api.pages == [(HISTORY_PAGE_SIZE, 0)]
+    assert history.revision == revision + 1
+    assert [row.id for row in history.rows] == [record["id"] for record in edited]
+    assert next(row for row in history.rows if row.id == 10).quantity == 10.0
+
+    # The full sync restarts the interval: the next sync is a probe again.
+    api.pages.clear()
+    assert not await history.async_sync(api.fetch_page)
+    assert api.pages == [(HISTORY_PROBE_SIZE, 0)]
@@ -0,0 +1,40 @@
+"""Tests for the adaptive poll scheduler."""
+
+from datetime import date, timedelta
+
+from custom_components.spritmonitor.const import (
+    SCHEDULER_BURST_INTERVAL,
+    SCHEDULER_BURST_POLLS,
+    SCHEDULER_JITTER,
+)
+from custom_components.spritmonitor.scheduler import AdaptivePollScheduler
+
+BASE = timedelta(hours=24)
+
+
+def _scheduler() -> AdaptivePollScheduler:
+    scheduler = AdaptivePollScheduler("spritmonitor_1234", BASE)
+    scheduler.next_interval(True, date.today())  # the first update is never a change
+    return scheduler
+
+
+def test_unchanged_polls_stay_near_the_base_interval() -> None:
+    scheduler = _scheduler()
+    for _ in range(10):
+        interval = scheduler.next_interval(False, date.today())
+        assert BASE * (1 - SCHEDULER_JITTER) <= interval <= BASE * (1 + SCHEDULER_JITTER)
+
+
+def test_change_starts_a_burst() -> None:
+    scheduler = _scheduler()
+    intervals = [scheduler.next_interval(changed, date.today()) for changed in (True, False, False, False)]
+    assert intervals[:SCHEDULER_BURST_POLLS] == [SCHEDULER_BURST_INTERVAL] * SCHEDULER_BURST_POLLS
+    assert intervals[SCHEDULER_BURST_POLLS] > SCHEDULER_BURST_INTERVAL
+
+
+def test_date_rollover_alone_does_not_start_a_burst(freezer) -> None:
+    scheduler = _scheduler()
+    for _ in range(3):
+        freezer.tick(BASE)
+        assert scheduler.next_interval(False, date.today()) != SCHEDULER_BURST_INTERVAL
+    assert all(decision["reason"] != "burst" for decision in scheduler.decisions)
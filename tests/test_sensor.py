@@ -0,0 +1,79 @@
+"""Tests for the Spritmonitor sensors."""
+
+from datetime import timedelta
+
+import pytest
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.spritmonitor.const import DATA_QUEUE, DOMAIN, QUEUE_AGE_UPDATE_INTERVAL, SIGNAL_QUEUE_UPDATED
+
+from .conftest import VEHICLE_ID, async_add_vehicle_entry
+
+FETCHED = "sensor.skoda_octavia_fuelings_fetched"
+OLDEST_PENDING = "sensor.skoda_octavia_oldest_pending_fueling_age"
+
+
+async def _async_add_entry_with(hass, *sensor_ids):
+    """A vehicle entry with some of its disabled-by-default sensors enabled."""
+    for sensor_id in sensor_ids:
+        er.async_get(hass).async_get_or_create(
+            "sensor", DOMAIN, f"spritmonitor_{VEHICLE_ID}_{sensor_id}",
+            suggested_object_id=f"skoda_octavia_{sensor_id}",
+        )
+    return await async_add_vehicle_entry(hass)
+
+
+@pytest.fixture
+async def metric_entry(hass, mock_api):
+    entry = await _async_add_entry_with(hass, "fuelings_fetched")
+    yield entry
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+@pytest.fixture
+async def queue_entry(hass, mock_api):
+    entry = await _async_add_entry_with(hass, "oldest_pending_fueling_age")
+    yield entry
+    await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_metric_sensor_writes_new_percentiles_of_an_unchanged_value(hass, metric_entry) -> None:
+    coordinator = hass.data[DOMAIN][metric_entry.entry_id]
+    # After the initial full sync, every update fetches the same probe page.
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    before = hass.states.get(FETCHED)
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+
+    after = hass.states.get(FETCHED)
+    assert after.state == before.state
+    assert after.attributes["samples"] == before.attributes["samples"] + 1
+
+
+async def test_oldest_pending_age_grows_while_the_queue_is_unchanged(hass, queue_entry) -> None:
+    queue = hass.data[DOMAIN][DATA_QUEUE]
+    queue.items.append({
+        "key": "pending", "entry_id": queue_entry.entry_id, "vehicle_id": VEHICLE_ID, "tank_id": 1, "params": {},
+        "queued_at": dt_util.utcnow().isoformat(), "attempts": 1, "last_error": "API unavailable (503)",
+    })
+    async_dispatcher_send(hass, SIGNAL_QUEUE_UPDATED)
+    await hass.async_block_till_done()
+    assert float(hass.states.get(OLDEST_PENDING).state) < 5
+
+    # No queue change, only time passing: the item waits in backoff.
+    queue.items[0]["queued_at"] = (dt_util.utcnow() - timedelta(minutes=5)).isoformat()
+    async_fire_time_changed(hass, dt_util.utcnow() + QUEUE_AGE_UPDATE_INTERVAL)
+    await hass.async_block_till_done()
+    assert float(hass.states.get(OLDEST_PENDING).state) >= 300
+
+    queue.items.clear()
+    async_dispatcher_send(hass, SIGNAL_QUEUE_UPDATED)
+    await hass.async_block_till_done()
+    assert hass.states.get(OLDEST_PENDING).state == "unknown"
@@ -0,0 +1,80 @@
+"""Tests for the rolling windows."""
+
+from datetime import date, timedelta
+
+from custom_components.spritmonitor.models import FuelingRow
+from custom_components.spritmonitor.windows import RollingWindow, WindowEngine
+
+DAY = date(2025, 3, 1)
+
+
+def _row(day: int, trip: float | None, cost: float | None, quantity: float = 40.0) -> FuelingRow:
+    return FuelingRow(
+        id=day, date=DAY + timedelta(days=day), odometer=None, trip=trip, quantity=quantity, cost=cost,
+        consumption=6.1, tank_id=1, type="full", location=None, country=None, price_per_unit=None,
+    )
+
+
+def test_evicting_the_last_billed_fueling_clears_cost_per_distance() -> None:
+    """Rounding residue of the billed sums must not survive their last fueling."""
+    window = RollingWindow(records=2)
+    for seq, row in enumerate([
+        _row(0, 455.1, 70.31), _row(1, 333.3, 65.13), _row(2, None, None), _row(3, 455.1, None),
+    ]):
+        window.push(seq, row)
+
+    assert window.values()["cost_per_distance"] is None
+    assert window.values()["cost"] == 0
+
+    window.push(4, _row(4, 500.0, 60.0))
+    assert window.values()["cost_per_distance"] == 0.12
+
+
+def _tanks(*rows: FuelingRow) -> dict:
+    """A combustion vehicle's tank lists, newest first."""
+    return {"": sorted(rows, key=lambda row: row.date, reverse=True)}
+
+
+def test_record_window_evicts_its_oldest_fueling() -> None:
+    engine = WindowEngine(records=(2,), days=())
+    rows = [_row(0, 500.0, 90.0, quantity=50.0), _row(1, 500.0, 60.0), _row(2, 500.0, 60.0)]
+
+    values = engine.update(_tanks(*rows[:2]), DAY + timedelta(days=1), revision=1)
+    assert values["window_cost_last2"] == 150.0
+    assert values["window_price_spread_last2"] == 0.3
+
+    values = engine.update(_tanks(*rows), DAY + timedelta(days=2), revision=1)
+    assert values["window_cost_last2"] == 120.0
+    assert values["window_price_spread_last2"] == 0.0  # the 1.8 price left with its fueling
+    assert engine.replays == 1
+
+
+def test_day_window_expires_without_new_fuelings() -> None:
+    engine = WindowEngine(records=(), days=(30,))
+    tanks = _tanks(_row(0, 500.0, 60.0), _row(20, 500.0, 70.0))
+
+    values = engine.update(tanks, DAY + timedelta(days=25), revision=1)
+    assert values["window_cost_30d"] == 130.0
+
+    values = engine.update(tanks, DAY + timedelta(days=40), revision=1)
+    assert values["window_cost_30d"] == 70.0
+    assert values["window_cost_per_distance_30d"] == 0.14
+
+    values = engine.update(tanks, DAY + timedelta(days=60), revision=1)
+    assert values["window_cost_30d"] == 0
+    assert values["window_consumption_30d"] is None
+    assert values["window_cost_per_distance_30d"] is None
+    assert engine.replays == 1
+
+
+def test_backdated_fueling_replays_the_tank() -> None:
+    engine = WindowEngine(records=(2,), days=())
+    engine.update(_tanks(_row(0, 500.0, 60.0), _row(10, 500.0, 70.0)), DAY + timedelta(days=10), revision=1)
+
+    values = engine.update(
+        _tanks(_row(0, 500.0, 60.0), _row(5, 500.0, 80.0), _row(10, 500.0, 70.0)),
+        DAY + timedelta(days=10), revision=1,
+    )
+
+    assert engine.replays == 2
+    assert values["window_cost_last2"] == 150.0
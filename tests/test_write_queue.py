@@ -0,0 +1,152 @@
+"""Tests for the offline write queue of add_fueling."""
+
+from datetime import date
+
+import pytest
+from homeassistant.helpers import device_registry as dr
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse
+
+from custom_components.spritmonitor.const import API_BASE_URL, API_FUELINGS_URL_TPL, DATA_QUEUE, DOMAIN
+
+from .conftest import VEHICLE, VEHICLE_ID, async_add_vehicle_entry
+
+FUELING_URL = f"{API_BASE_URL}/vehicle/{VEHICLE_ID}/tank/1/fueling.json"
+
+
+def _service_data(hass, vehicle_id=VEHICLE_ID, **fields) -> dict:
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, str(vehicle_id))})
+    return {
+        "vehicle_device": device.id,
+        "tank_id": 1,
+        "date": date.today().isoformat(),
+        "trip": 600,
+        "quantity": 40,
+        "type": "full",
+        "fuelsort_id": 7,
+        "quantity_unit_id": 1,
+        **fields,
+    }
+
+
+def _posted_odometers(mock_api, vehicle_id=VEHICLE_ID) -> list:
+    return [
+        float(call[2]["odometer"]) for call in mock_api.mock_calls
+        if call[0] == "POST" and f"/vehicle/{vehicle_id}/" in str(call[1])
+    ]
+
+
+@pytest.fixture
+def api_status(mock_api) -> dict:
+    """The status the mocked fueling.json answers with; tests switch it."""
+    status = {"post": 503}
+
+    async def post_fueling(method, url, data):
+        return AiohttpClientMockResponse(method, url, status=status["post"], json={})
+
+    mock_api.post(FUELING_URL, side_effect=post_fueling)
+    return status
+
+
+@pytest.fixture
+def queue(hass, vehicle_entry, api_status):
+    return hass.data[DOMAIN][DATA_QUEUE]
+
+
+async def test_add_fueling_reports_a_queued_submission(hass, queue) -> None:
+    response = await hass.services.async_call(
+        DOMAIN, "add_fueling", _service_data(hass, odometer=30000), blocking=True, return_response=True,
+    )
+
+    assert response["submitted"] is False
+    assert response["queued"] == queue.items[0]["key"]
+    notifications = hass.data["persistent_notification"]
+    assert f"{DOMAIN}_write_queue_{queue.items[0]['entry_id']}" in notifications
+
+
+async def test_replay_submits_in_order_and_clears_the_notification(hass, queue, mock_api, api_status) -> None:
+    for odometer in (30000, 30600):
+        await hass.services.async_call(DOMAIN, "add_fueling", _service_data(hass, odometer=odometer), blocking=True)
+    assert queue.depth() == 2
+    assert _posted_odometers(mock_api) == [30000]  # the second one waited behind the first
+
+    api_status["post"] = 200
+    await queue.async_replay()
+
+    assert _posted_odometers(mock_api) == [30000, 30000, 30600]
+    assert queue.depth() == 0
+    assert not hass.data["persistent_notification"]
+
+
+async def test_replay_drops_a_fueling_already_in_the_history(hass, queue, mock_api, api_status, fuelings) -> None:
+    """As if the first attempt had reached the server although it answered with an error."""
+    newest = fuelings[0]
+    await hass.services.async_call(
+        DOMAIN, "add_fueling", _service_data(hass, odometer=newest["odometer"], price=newest["cost"]), blocking=True,
+    )
+
+    api_status["post"] = 200
+    await queue.async_replay()
+
+    assert _posted_odometers(mock_api) == [newest["odometer"]]
+    assert queue.depth() == 0
+
+
+async def test_replay_submits_a_different_fueling_of_the_same_day_and_quantity(
+    hass, queue, mock_api, api_status, fuelings,
+) -> None:
+    odometer = fuelings[0]["odometer"] + 600
+    await hass.services.async_call(DOMAIN, "add_fueling", _service_data(hass, odometer=odometer), blocking=True)
+
+    api_status["post"] = 200
+    await queue.async_replay()
+
+    assert _posted_odometers(mock_api) == [odometer, odometer]
+    assert queue.depth() == 0
+
+
+async def test_another_vehicles_backlog_does_not_hold_this_one_back(hass, queue, mock_api, api_status) -> None:
+    queue.items.append({
+        "key": "other", "entry_id": "other_entry", "vehicle_id": 5678, "tank_id": 1, "params": {},
+        "queued_at": "2025-01-01T00:00:00+00:00", "attempts": 1, "last_error": "API unavailable (503)",
+    })
+    api_status["post"] = 200
+
+    response = await hass.services.async_call(
+        DOMAIN, "add_fueling", _service_data(hass, odometer=30000), blocking=True, return_response=True,
+    )
+
+    assert response["submitted"] is True
+    assert _posted_odometers(mock_api) == [30000]
+    assert queue.depth() == 1
+
+
+async def test_a_failing_vehicle_does_not_stall_the_replay_of_another(
+    hass, queue, mock_api, api_status, vehicles,
+) -> None:
+    vehicles.append({**VEHICLE, "id": 5678, "model": "Fabia"})
+    mock_api.get(API_FUELINGS_URL_TPL.format(vehicle_id=5678), json=[])
+    other_status = {"post": 503}
+
+    async def post_other_fueling(method, url, data):
+        return AiohttpClientMockResponse(method, url, status=other_status["post"], json={})
+
+    mock_api.post(f"{API_BASE_URL}/vehicle/5678/tank/1/fueling.json", side_effect=post_other_fueling)
+    other = await async_add_vehicle_entry(hass, 5678)
+    # The failing vehicle's fueling is queued first, ahead of the other one's.
+    await hass.services.async_call(DOMAIN, "add_fueling", _service_data(hass, odometer=30000), blocking=True)
+    for odometer in (50000, 50600):
+        await hass.services.async_call(
+            DOMAIN, "add_fueling", _service_data(hass, 5678, odometer=odometer), blocking=True,
+        )
+    assert queue.depth() == 3
+
+    other_status["post"] = 200  # only the other vehicle's API recovers
+    await queue.async_replay()
+
+    assert _posted_odometers(mock_api, 5678) == [50000, 50000, 50600]
+    assert queue.depth(other.entry_id) == 0
+    assert queue.depth() == 1
+    assert queue.items[0]["attempts"] == 1
+    assert f"{DOMAIN}_write_queue_{other.entry_id}" not in hass.data["persistent_notification"]
+
+    await hass.config_entries.async_unload(other.entry_id)